@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import numpy as np
+from metrics import PhaseTimer, instrument_engine, instrument_gridiron
+
+# Keep pygame's banner out of the JSON lines written to stdout
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+SIZES = (50, 350, 2000)
+PATHS = ("engine", "gridiron")
+
+
+def seed_all(seed: int):
+    """
+    Seeds the random module and np.random
+
+    :param seed: seed to use
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def run_engine(games: int, ticks: int, generations: int, seed: int, racing=None, players=3, nearest=None,
+               hidden=None, decision_interval=1, play_budget=None, stall_ticks=None) -> dict:
+    """
+    Benchmarks evolution.Evolution on the batched Engine
+
+    :param games: games played each generation
+    :param ticks: ticks each game is played for
+    :param generations: generations to run
+    :param seed: seed for the run
+    :param racing: ticks of each successive halving round, None plays every game for ticks
+    :param players: players per side, a key of team.FORMATIONS
+    :param nearest: number of nearest players sensed, None senses every opponent
+    :param hidden: offense and defense hidden layer sizes, None uses the team defaults
+    :param decision_interval: ticks between network decisions, see Engine
+    :param play_budget: plays after which a game is finished, None plays every game for the whole tick budget
+    :param stall_ticks: ticks after which a game that neither scored nor carried the ball further is finished
+    :return: timings
+    """
+    import evolution
+
+    seed_all(seed)
+    timer = PhaseTimer()
+    instrument_engine(timer)
+    try:
+        run = evolution.Evolution(games // 2, seed=seed, ticks=ticks, racing=racing, players=players,
+                                  nearest=nearest, hidden=hidden, decision_interval=decision_interval,
+                                  play_budget=play_budget, stall_ticks=stall_ticks)
+        start = time.perf_counter()
+        game_ticks = 0
+        for _ in range(generations):
+            run.step()
+            game_ticks += run.game_ticks
+        wall = time.perf_counter() - start
+    finally:
+        timer.restore()
+    return {"wall": wall, "phases": dict(timer.totals), "calls": dict(timer.calls),
+            "points": float(run.points.sum()), "game_ticks": game_ticks}
+
+
+def run_gridiron(games: int, ticks: int, generations: int, seed: int, players=3, nearest=None,
+                 hidden=None, decision_interval=1, play_budget=None, stall_ticks=None) -> dict:
+    """
+    Benchmarks main's Gridiron loop without rendering
+
+    :param games: games played each generation
+    :param ticks: ticks each game is played for
+    :param generations: generations to run
+    :param seed: seed for the run
+    :param players: players per side, a key of team.FORMATIONS
+    :param nearest: number of nearest players sensed, None senses every opponent
+    :param hidden: offense and defense hidden layer sizes, None uses the team defaults
+    :param decision_interval: ticks between network decisions, see Engine
+    :param play_budget: plays after which a game is finished, None plays every game for the whole tick budget
+    :param stall_ticks: ticks after which a game that neither scored nor carried the ball further is finished
+    :return: timings
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import gridiron
+    import neural_net
+    import team
+    from reproduction import Reproduction
+    from evolution import SCREEN_SIZE, FIELD_BOUNDS
+
+    pygame.init()
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    seed_all(seed)
+    timer = PhaseTimer()
+    instrument_gridiron(timer)
+    timer.wrap(Reproduction, "reproduce", "selection")
+    try:
+        offense_positions, defense_positions = team.formation(players)
+        offense_size, defense_size = team.team_sizes(players)
+        offense_sizes, defense_sizes = team.network_sizes(players, nearest, hidden)
+        offense_networks = neural_net.Population(games * offense_size, offense_sizes)
+        defense_networks = neural_net.Population(games * defense_size, defense_sizes)
+        offenses = [team.Offense(offense_networks.networks[i:i + offense_size], offense_positions)
+                    for i in range(0, offense_networks.size, offense_size)]
+        defenses = [team.Defense(defense_networks.networks[i:i + defense_size], defense_positions)
+                    for i in range(0, defense_networks.size, defense_size)]
+
+        offense_reproduction = Reproduction(offense_networks, offense_size)
+        defense_reproduction = Reproduction(defense_networks, defense_size)
+
+        start = time.perf_counter()
+        game_ticks = 0
+        for generation in range(generations):
+            offense_index, defense_index = np.random.permutation(games), np.random.permutation(games)
+            active_games = [gridiron.Gridiron(offenses[o], defenses[d], FIELD_BOUNDS, screen, nearest,
+                                              decision_interval, play_budget, stall_ticks)
+                            for o, d in zip(offense_index, defense_index)]
+            for _ in range(ticks):
+                gridiron.update_games(active_games)
+                if all(game.finished for game in active_games):
+                    break
+            game_ticks += sum(g.time for g in active_games)
+            points = np.array([g.points for g in active_games])
+            offense_reproduction.reproduce(points[np.argsort(offense_index)], np.random.randint(2 ** 31))
+            defense_reproduction.reproduce(-points[np.argsort(defense_index)], np.random.randint(2 ** 31))
+        wall = time.perf_counter() - start
+    finally:
+        timer.restore()
+        pygame.quit()
+    return {"wall": wall, "phases": dict(timer.totals), "calls": dict(timer.calls),
+            "points": float(sum(g.points for g in active_games)), "game_ticks": game_ticks}
+
+
+def benchmark(path: str, games: int, ticks: int, generations: int, seed: int, racing=None, players=3,
+              nearest=None, hidden=None, decision_interval=1, play_budget=None, stall_ticks=None) -> dict:
+    """
+    Runs one benchmark and derives its rates
+
+    :param path: "engine" or "gridiron"
+    :param games: games played each generation
+    :param ticks: ticks each game is played for
+    :param generations: generations to run
+    :param seed: seed for the run
+    :param racing: ticks of each successive halving round on the engine path
+    :param players: players per side, a key of team.FORMATIONS
+    :param nearest: number of nearest players sensed, None senses every opponent
+    :param hidden: offense and defense hidden layer sizes, None uses the team defaults
+    :param decision_interval: ticks between network decisions, points show what it costs in fidelity
+    :param play_budget: plays after which a game is finished, None plays every game for the whole tick budget
+    :param stall_ticks: ticks after which a game that neither scored nor carried the ball further is finished
+    :return: result record
+    """
+    if path == "engine":
+        result = run_engine(games, ticks, generations, seed, racing, players, nearest, hidden, decision_interval,
+                            play_budget, stall_ticks)
+    else:
+        result = run_gridiron(games, ticks, generations, seed, players, nearest, hidden, decision_interval,
+                              play_budget, stall_ticks)
+    wall = result["wall"]
+    return {"path": path, "games": games, "ticks": ticks, "generations": generations, "seed": seed,
+            "players": players, "nearest": nearest, "hidden": hidden, "decision_interval": decision_interval,
+            "play_budget": play_budget, "stall_ticks": stall_ticks,
+            "racing": racing if path == "engine" else None,
+            "wall": wall,
+            "ticks_per_sec": ticks * generations / wall,
+            "game_ticks": result["game_ticks"],
+            "game_ticks_per_sec": result["game_ticks"] / wall,
+            "generations_per_sec": generations / wall,
+            "phases": result["phases"], "calls": result["calls"], "points": result["points"]}
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parses the command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the simulation with fixed seeds")
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=list(PATHS), help="simulation paths to run")
+    parser.add_argument("--games", nargs="+", type=int, default=list(SIZES), help="games per generation")
+    parser.add_argument("--ticks", type=int, default=600, help="ticks each game is played for")
+    parser.add_argument("--generations", type=int, default=1, help="generations to run")
+    parser.add_argument("--seed", type=int, default=0, help="seed for random and np.random")
+    parser.add_argument("--racing", nargs="+", type=int, default=None,
+                        help="ticks of each successive halving round on the engine path")
+    parser.add_argument("--players", type=int, default=3, help="players per side")
+    parser.add_argument("--nearest", type=int, default=None, help="sense only the nearest K players")
+    parser.add_argument("--offense-hidden", nargs="+", type=int, default=[], help="offense hidden layer sizes")
+    parser.add_argument("--defense-hidden", nargs="+", type=int, default=[], help="defense hidden layer sizes")
+    parser.add_argument("--decision-interval", type=int, default=1, help="ticks between network decisions")
+    parser.add_argument("--play-budget", type=int, default=None, help="plays after which a game is finished")
+    parser.add_argument("--stall-ticks", type=int, default=None, help="ticks after which a stalled game is finished")
+    parser.add_argument("--output", default=None, help="file to append JSON lines results to, defaults to stdout")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    environment = {"python": platform.python_version(), "numpy": np.__version__,
+                   "machine": platform.machine(), "cpus": os.cpu_count()}
+    out = open(args.output, "a") if args.output else sys.stdout
+    try:
+        for path in args.paths:
+            for games in args.games:
+                record = benchmark(path, games, args.ticks, args.generations, args.seed, args.racing,
+                                   args.players, args.nearest, (args.offense_hidden, args.defense_hidden),
+                                   args.decision_interval, args.play_budget, args.stall_ticks)
+                record["environment"] = environment
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
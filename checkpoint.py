@@ -0,0 +1,264 @@
+import json
+import os
+import re
+import struct
+import numpy as np
+
+MAGIC = b"FBAI"
+VERSION = 1
+ALIGN = 64
+FULL_EVERY = 50
+KEEP = 2
+FILE_PATTERN = re.compile(r"gen_(\d+)_(full|delta)\.ckpt$")
+# Arrays of fitness_cache.FitnessCache.state() in a checkpoint
+CACHE_ARRAYS = ("cache_offense", "cache_defense", "cache_scenario", "cache_points", "cache_plays")
+
+
+class Checkpoint:
+    """
+    State of a run at the end of a generation. Arrays loaded from a file are memory-mapped copy-on-write,
+    so nothing is read until it is used and changing them never touches the file.
+    """
+    def __init__(self, generation: int, offense: list[np.ndarray], defense: list[np.ndarray], points=None,
+                 offense_index=None, defense_index=None, offense_winners=None, defense_winners=None,
+                 rng_state=None, random_state=None, fitness_cache=None):
+        """
+        :param generation: number of generations played
+        :param offense: per layer weights of the offense population shaped (N, out, in)
+        :param defense: per layer weights of the defense population shaped (N, out, in)
+        :param points: points scored in each game of the generation
+        :param offense_index: offense team that played each game
+        :param defense_index: defense team that played each game
+        :param offense_winners: offense teams kept by selection
+        :param defense_winners: defense teams kept by selection
+        :param rng_state: state of the numpy RandomState driving the run, from RandomState.get_state()
+        :param random_state: state of the random module, from random.getstate()
+        :param fitness_cache: outcomes of the run's fitness cache, from fitness_cache.FitnessCache.state()
+        """
+        self.generation = generation
+        self.offense = offense
+        self.defense = defense
+        self.points = points
+        self.offense_index = offense_index
+        self.defense_index = defense_index
+        self.offense_winners = offense_winners
+        self.defense_winners = defense_winners
+        self.rng_state = rng_state
+        self.random_state = random_state
+        self.fitness_cache = fitness_cache
+
+
+class Checkpointer:
+    """
+    Writes a checkpoint into a directory every generation. With deltas, only the networks that changed
+    since the previous checkpoint are written, with a full checkpoint every full_every generations.
+    Only the newest keep full checkpoints and the deltas after them are kept on disk.
+    """
+    def __init__(self, directory: str, deltas=False, full_every=FULL_EVERY, keep=KEEP):
+        """
+        :param directory: directory to write checkpoints into
+        :param deltas: whether to write deltas between full checkpoints
+        :param full_every: generations between full checkpoints when writing deltas
+        :param keep: number of full checkpoints to keep
+        """
+        self.directory = directory
+        self.deltas = deltas
+        self.full_every = full_every
+        self.keep = keep
+        self._previous = None
+        self._previous_path = None
+        self._since_full = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, checkpoint: Checkpoint) -> str:
+        """
+        Writes the checkpoint as a delta or full checkpoint and removes old checkpoints
+
+        :param checkpoint: checkpoint to write
+        :return: path of the written file
+        """
+        delta = self.deltas and self._previous is not None and self._since_full < self.full_every
+        kind = "delta" if delta else "full"
+        path = os.path.join(self.directory, f"gen_{checkpoint.generation:08d}_{kind}.ckpt")
+        if delta:
+            save(path, checkpoint, base=self._previous_path, previous=self._previous)
+            self._since_full += 1
+        else:
+            save(path, checkpoint)
+            self._since_full = 1
+            self.prune()
+
+        if self.deltas:
+            self._previous = ([w.copy() for w in checkpoint.offense], [w.copy() for w in checkpoint.defense])
+        self._previous_path = os.path.basename(path)
+        return path
+
+    def prune(self):
+        """
+        Removes every checkpoint older than the newest keep full checkpoints
+        """
+        files = sorted(checkpoint_files(self.directory))
+        full = [generation for generation, kind, _ in files if kind == "full"]
+        if len(full) <= self.keep:
+            return
+        oldest = full[-self.keep]
+        for generation, _, path in files:
+            if generation < oldest:
+                os.remove(path)
+
+
+def checkpoint_files(directory: str) -> list[tuple[int, str, str]]:
+    """
+    Lists the checkpoints in a directory
+
+    :param directory: directory to search
+    :return: (generation, "full" or "delta", path) of each checkpoint
+    """
+    files = []
+    for name in os.listdir(directory):
+        match = FILE_PATTERN.match(name)
+        if match:
+            files.append((int(match.group(1)), match.group(2), os.path.join(directory, name)))
+    return files
+
+
+def save(path: str, checkpoint: Checkpoint, base=None, previous=None):
+    """
+    Writes a checkpoint file. The file is written next to path and moved into place,
+    so a run killed mid write never leaves a broken checkpoint behind.
+
+    :param path: path of the file
+    :param checkpoint: checkpoint to write
+    :param base: file name of the checkpoint a delta applies to, None writes a full checkpoint
+    :param previous: (offense, defense) weights of the base checkpoint, needed for a delta
+    """
+    arrays = {}
+    meta = {"generation": checkpoint.generation, "base": base}
+    for side, weights in (("offense", checkpoint.offense), ("defense", checkpoint.defense)):
+        meta[side + "_layers"] = len(weights)
+        if base is None:
+            for i, w in enumerate(weights):
+                arrays[f"{side}_{i}"] = w
+        else:
+            old = previous[0] if side == "offense" else previous[1]
+            changed = np.zeros(len(weights[0]), dtype=bool)
+            for w, o in zip(weights, old):
+                changed |= (w != o).reshape(len(w), -1).any(axis=1)
+            rows = np.flatnonzero(changed)
+            arrays[side + "_rows"] = rows
+            for i, w in enumerate(weights):
+                arrays[f"{side}_{i}"] = w[rows]
+
+    for name in ("points", "offense_index", "defense_index", "offense_winners", "defense_winners"):
+        if getattr(checkpoint, name) is not None:
+            arrays[name] = getattr(checkpoint, name)
+    if checkpoint.fitness_cache is not None:
+        arrays.update(zip(CACHE_ARRAYS, checkpoint.fitness_cache))
+    if checkpoint.rng_state is not None:
+        algorithm, keys, pos, has_gauss, cached_gaussian = checkpoint.rng_state
+        arrays["rng_keys"] = keys
+        meta["rng"] = [algorithm, int(pos), int(has_gauss), float(cached_gaussian)]
+    if checkpoint.random_state is not None:
+        version, internal, gauss_next = checkpoint.random_state
+        meta["random"] = [version, list(internal), gauss_next]
+
+    write(path, arrays, meta)
+
+
+def load(path: str) -> Checkpoint:
+    """
+    Loads a checkpoint, applying deltas on top of the full checkpoint they are based on
+
+    :param path: checkpoint file, or a directory to load its newest checkpoint
+    :return: the loaded checkpoint
+    """
+    if os.path.isdir(path):
+        files = checkpoint_files(path)
+        if not files:
+            raise FileNotFoundError(f"no checkpoints in {path}")
+        path = max(files)[2]
+
+    meta, arrays = read(path)
+    chain = [(meta, arrays)]
+    while chain[-1][0]["base"] is not None:
+        chain.append(read(os.path.join(os.path.dirname(path), chain[-1][0]["base"])))
+
+    base_meta, base_arrays = chain.pop()
+    weights = {side: [base_arrays[f"{side}_{i}"] for i in range(base_meta[side + "_layers"])]
+               for side in ("offense", "defense")}
+    for _, delta_arrays in reversed(chain):
+        for side in ("offense", "defense"):
+            rows = delta_arrays[side + "_rows"]
+            for i, w in enumerate(weights[side]):
+                w[rows] = delta_arrays[f"{side}_{i}"]
+
+    rng_state = None
+    if "rng" in meta:
+        algorithm, pos, has_gauss, cached_gaussian = meta["rng"]
+        rng_state = (algorithm, np.array(arrays["rng_keys"]), pos, has_gauss, cached_gaussian)
+    random_state = None
+    if "random" in meta:
+        version, internal, gauss_next = meta["random"]
+        random_state = (version, tuple(internal), gauss_next)
+    fitness_cache = tuple(arrays[name] for name in CACHE_ARRAYS) if CACHE_ARRAYS[0] in arrays else None
+
+    return Checkpoint(meta["generation"], weights["offense"], weights["defense"], arrays.get("points"),
+                      arrays.get("offense_index"), arrays.get("defense_index"), arrays.get("offense_winners"),
+                      arrays.get("defense_winners"), rng_state, random_state, fitness_cache)
+
+
+def write(path: str, arrays: dict, meta: dict):
+    """
+    Writes named arrays in the checkpoint format: MAGIC, the length of a JSON header, the header,
+    then the raw bytes of every array aligned to ALIGN bytes
+
+    :param path: path of the file
+    :param arrays: dict of name to array
+    :param meta: JSON serializable values stored in the header
+    """
+    entries = {}
+    offset = 0
+    contiguous = {}
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        contiguous[name] = a
+        entries[name] = [a.dtype.str, list(a.shape), offset]
+        offset += -(-a.nbytes // ALIGN) * ALIGN
+    header = json.dumps({"version": VERSION, "meta": meta, "arrays": entries}).encode()
+    start = -(-(len(MAGIC) + 4 + len(header)) // ALIGN) * ALIGN
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for name, a in contiguous.items():
+            f.seek(start + entries[name][2])
+            f.write(a.tobytes())
+        f.truncate(start + offset)
+    os.replace(temporary, path)
+
+
+def read(path: str) -> tuple[dict, dict]:
+    """
+    Reads a file written by write(), memory-mapping every array copy-on-write
+
+    :param path: path of the file
+    :return: the header's meta values and a dict of name to array
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a checkpoint")
+        length = struct.unpack("<I", f.read(4))[0]
+        header = json.loads(f.read(length))
+    if header["version"] != VERSION:
+        raise ValueError(f"{path} has unsupported checkpoint version {header['version']}")
+    start = -(-(len(MAGIC) + 4 + length) // ALIGN) * ALIGN
+
+    arrays = {}
+    for name, (dtype, shape, offset) in header["arrays"].items():
+        if np.prod(shape) == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="c", offset=start + offset, shape=tuple(shape))
+    return header["meta"], arrays
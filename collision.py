@@ -0,0 +1,133 @@
+import math
+import numpy as np
+from physics import SIZE, SCALE
+
+COLLIDE_RATIO = 0.80
+
+
+def offsets(x: np.ndarray, y: np.ndarray, ox: np.ndarray, oy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gets the offset from every player to every opponent
+
+    :param x: x coordinates of the players, shaped (games, players)
+    :param y: y coordinates of the players, shaped (games, players)
+    :param ox: x coordinates of the opponents, shaped (games, opponents)
+    :param oy: y coordinates of the opponents, shaped (games, opponents)
+    :return: x and y offsets shaped (games, players, opponents)
+    """
+    return ox[:, None, :] - x[:, :, None], oy[:, None, :] - y[:, :, None]
+
+
+def collide(dx: np.ndarray, dy: np.ndarray, size: np.ndarray, osize: np.ndarray, ratio=COLLIDE_RATIO) -> np.ndarray:
+    """
+    Checks every player against every opponent for overlapping rects,
+    the array equivalent of pygame.sprite.groupcollide() with pygame.sprite.collide_rect_ratio()
+
+    :param dx: x offsets from offsets()
+    :param dy: y offsets from offsets()
+    :param size: rect width of the players, shaped (games, players)
+    :param osize: rect width of the opponents, shaped (games, opponents)
+    :param ratio: ratio rects are scaled by before checking
+    :return: boolean array of collisions shaped (games, players, opponents)
+    """
+    return collide_pairs(dx, dy, size[:, :, None], osize[:, None, :], ratio)
+
+
+def collide_pairs(dx: np.ndarray, dy: np.ndarray, size: np.ndarray, osize: np.ndarray,
+                  ratio=COLLIDE_RATIO) -> np.ndarray:
+    """
+    collide() for any set of player and opponent pairs, such as the candidates of spatial.neighbours()
+
+    :param dx: x offsets from each player to each paired opponent
+    :param dy: y offsets from each player to each paired opponent
+    :param size: rect width of the players, broadcastable against dx
+    :param osize: rect width of the paired opponents, broadcastable against dx
+    :param ratio: ratio rects are scaled by before checking
+    :return: boolean array of collisions shaped like dx
+    """
+    reach = ratio * (size + osize) / 2
+    return (np.abs(dx) < reach) & (np.abs(dy) < reach)
+
+
+def push(collided: np.ndarray, dx: np.ndarray, dy: np.ndarray, size: np.ndarray, strength: np.ndarray,
+         ostrength: np.ndarray, oangle: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gets the external force on every player from colliding opponents at least as strong as them whose
+    face crosses the player's rect, the line between the two corners of their face clipped against the rect
+
+    :param collided: collisions from collide()
+    :param dx: x offsets from offsets()
+    :param dy: y offsets from offsets()
+    :param size: rect width of the players, shaped (games, players)
+    :param strength: strength of the players, shaped (players,)
+    :param ostrength: strength of the opponents, shaped (opponents,)
+    :param oangle: angle of the opponents, shaped (games, opponents)
+    :return: x and y external force on each player, shaped (games, players)
+    """
+    return push_pairs(collided, dx, dy, size[:, :, None], strength[:, None], ostrength, oangle[:, None, :])
+
+
+def push_pairs(collided: np.ndarray, dx: np.ndarray, dy: np.ndarray, size: np.ndarray, strength: np.ndarray,
+               ostrength: np.ndarray, oangle: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    push() for any set of player and opponent pairs. Every argument is broadcastable against collided,
+    whose last axis holds the pairs of each player.
+
+    :param collided: collisions from collide_pairs()
+    :param dx: x offsets from each player to each paired opponent
+    :param dy: y offsets from each player to each paired opponent
+    :param size: rect width of the players
+    :param strength: strength of the players
+    :param ostrength: strength of the paired opponents
+    :param oangle: angle of the paired opponents
+    :return: x and y external force on each player
+    """
+    force_x, force_y = pair_forces(collided, dx, dy, size, strength, ostrength, oangle)
+    return force_x.sum(axis=-1), force_y.sum(axis=-1)
+
+
+def pair_forces(collided, dx, dy, size, strength, ostrength, oangle) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gets the force each opponent pushes each player with, the pairs summed by push_pairs().
+    Takes the same arguments as push_pairs(), flat arrays of pairs such as those from spatial.neighbours() work too.
+
+    :return: x and y force of every pair, zero for pairs that don't push
+    """
+    half = size / 2
+    corner_distance = math.sqrt(2) * SIZE * SCALE / 2
+    radian = np.radians(oangle)
+    x1 = np.cos(radian + math.pi / 4) * corner_distance + dx
+    y1 = np.sin(radian + math.pi / 4) * -corner_distance + dy
+    x2 = np.cos(radian - math.pi / 4) * corner_distance + dx
+    y2 = np.sin(radian - math.pi / 4) * -corner_distance + dy
+    pushed = collided & (ostrength >= strength) & segment_hits_box(x1, y1, x2, y2, half)
+    force_x = 2 * np.cos(radian) * ostrength
+    force_y = 2 * np.sin(radian) * -ostrength
+    return pushed * force_x, pushed * force_y
+
+
+def segment_hits_box(x1, y1, x2, y2, half):
+    """
+    Liang-Barsky test of whether line segments cross boxes centered on the origin,
+    the array equivalent of pygame.Rect.clipline()
+
+    :param x1: x coordinate of the segment start relative to the box center
+    :param y1: y coordinate of the segment start relative to the box center
+    :param x2: x coordinate of the segment end relative to the box center
+    :param y2: y coordinate of the segment end relative to the box center
+    :param half: half the width of each box
+    :return: boolean array of hits
+    """
+    t0 = np.zeros(np.broadcast(x1, half).shape)
+    t1 = np.ones_like(t0)
+    hit = np.ones(t0.shape, dtype=bool)
+    dx, dy = x2 - x1, y2 - y1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, x1 + half), (dx, half - x1), (-dy, y1 + half), (dy, half - y1)):
+            p = np.broadcast_to(p, t0.shape)
+            q = np.broadcast_to(q, t0.shape)
+            hit &= (p != 0) | (q >= 0)
+            t = q / p
+            t0 = np.where(p < 0, np.maximum(t0, t), t0)
+            t1 = np.where(p > 0, np.minimum(t1, t), t1)
+    return hit & (t0 <= t1)
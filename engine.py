@@ -0,0 +1,393 @@
+import math
+import numpy as np
+import field
+import collision
+import sensors
+import spatial
+import team
+from neural_net import DTYPE, Population, feedforward
+from physics import DECISION_INTERVAL, SIZE, SCALE
+
+OFFENSE_ANGLE = 90
+DEFENSE_ANGLE = 270
+
+
+class Engine:
+    """
+    Headless struct-of-arrays simulation of many games at once.
+
+    Every player of every game is a column in a set of (games, players) arrays, offense players first
+    followed by the defense. Each call to step() advances every game by one tick with the same rules as
+    gridiron.Gridiron.update(), so the points array can be ranked the same way main ranks Gridiron objects.
+    Games that run out of plays or stall are retired and compacted out, see retire(), so only games
+    still doing useful work are stepped.
+    """
+    def __init__(self, offense: Population, defense: Population, bounds: tuple[float, float], height: float,
+                 offense_index=None, defense_index=None, seed=None, game_ids=None, players=team.PLAYERS,
+                 nearest=None, decision_interval=DECISION_INTERVAL, play_budget=None, stall_ticks=None,
+                 scenarios=None):
+        """
+        :param offense: networks of every offense player, one team after another in roster order
+        :param defense: networks of every defense player, one team after another in roster order
+        :param bounds: x coordinate bounds for the field
+        :param height: height of the field/window in pixels
+        :param offense_index: offense team playing each game, defaults to team i playing game i
+        :param defense_index: defense team playing each game, defaults to team i playing game i
+        :param seed: seed for the random starting positions, defaults to a seed drawn from np.random
+        :param game_ids: id of each game used with the seed, defaults to the game's index.
+        A game's starting positions only depend on the seed and its id, so games split across
+        several engines play out exactly as they would in one.
+        :param players: players per side, a key of team.FORMATIONS
+        :param nearest: number of nearest opponents and teammates each player senses through a spatial.neighbours()
+        grid, see sensors.sense_nearest(). None senses every opponent, see sensors.sense()
+        :param decision_interval: ticks between network decisions. Every game senses and runs its networks
+        on the ticks that are a multiple of it and repeats the last decision in between, see Player.update()
+        :param play_budget: plays after which a game is finished, None plays until the engine stops being run
+        :param stall_ticks: ticks after which a game that neither scored nor carried the ball further than before
+        is finished, None never finishes stalled games
+        :param scenarios: scenarios.ScenarioTable the games start their plays from, game_ids then being the
+        scenario of each game. None draws starting positions from the seed
+        """
+        self.offense = offense
+        self.defense = defense
+        self.seed = seed if seed is not None else np.random.randint(2 ** 31)
+        self.nearest = nearest
+        self.decision_interval = decision_interval
+        self.play_budget = play_budget
+        self.stall_ticks = stall_ticks
+        self.scenarios = scenarios
+
+        # Rosters
+        offense_positions, defense_positions = team.formation(players)
+        offense_roster = team.roster(offense_positions, team.OFFENSE_STATS)
+        defense_roster = team.roster(defense_positions, team.DEFENSE_STATS)
+        self.n_offense = len(offense_roster)
+        self.n_defense = len(defense_roster)
+        players = offense_roster + defense_roster
+        self.speed = np.array([stats[0] for _, stats in players], dtype=float)
+        self.strength = np.array([stats[1] for _, stats in players], dtype=float)
+        self.carrier = np.array([role == team.BALL_CARRIER for role, _ in offense_roster] + [False] * self.n_defense)
+
+        # Field bounds and coordinates, matching Gridiron
+        self.bounds = bounds
+        self.height = height
+        self.score_endzone = field.yard_to_pixel(10, height, offset=0)
+        saftey_endzone = field.yard_to_pixel(110, height, offset=0)
+        self.max_dist = math.sqrt((bounds[1] - bounds[0]) ** 2 + (self.score_endzone - saftey_endzone) ** 2)
+        self.scrimmage = field.yard_to_pixel(70, height)
+        self.snap = field.yard_to_pixel(80, height)
+        # Also the grid cell size, much larger than the reach of a collision so the grid finds every contact
+        self.radius = field.yard_to_pixel(sensors.SENSE_YARDS, height, offset=0)
+
+        # Optional recorder.Recorder every tick is recorded to
+        self.recorder = None
+        self.pair(offense_index, defense_index, game_ids)
+
+    def pair(self, offense_index=None, defense_index=None, game_ids=None):
+        """
+        Sets which teams play each game and resets every game to its starting state.
+        Weights are gathered once here so no network data is copied while the games run.
+
+        :param offense_index: offense team playing each game, defaults to team i playing game i
+        :param defense_index: defense team playing each game, defaults to team i playing game i
+        :param game_ids: id of each game used with the seed, defaults to the game's index
+        """
+        self.offense_weights = self.offense.grouped(self.n_offense)
+        self.defense_weights = self.defense.grouped(self.n_defense)
+        if offense_index is not None:
+            self.offense_weights = [w[offense_index] for w in self.offense_weights]
+        if defense_index is not None:
+            self.defense_weights = [w[defense_index] for w in self.defense_weights]
+        self.games = self.offense_weights[0].shape[0]
+
+        # Player state
+        shape = (self.games, self.n_offense + self.n_defense)
+        self.x = np.zeros(shape)
+        self.y = np.zeros(shape)
+        self.angle = np.zeros(shape)
+        self.size = np.full(shape, SIZE * SCALE)
+        self.has_ball = np.zeros(shape, dtype=bool)
+
+        # Game state, advance is the furthest fraction of the way to the end zone any carrier got
+        self.in_play = np.zeros(self.games, dtype=bool)
+        self.points = np.zeros(self.games)
+        self.plays = np.zeros(self.games, dtype=np.int64)
+        self.advance = np.zeros(self.games)
+        self.time = 0
+        self.game_ids = np.arange(self.games) if game_ids is None else np.asarray(game_ids)
+
+        # Stall detection, best is the highest points plus advance so far and idle the ticks since it went up
+        self.best = np.zeros(self.games)
+        self.idle = np.zeros(self.games, dtype=np.int64)
+
+        # Index of each row among the games paired, and the outcome of the games retired so far, see results()
+        self.index = np.arange(self.games)
+        self.final_points = np.zeros(self.games)
+        self.final_plays = np.zeros(self.games, dtype=np.int64)
+        self.final_advance = np.zeros(self.games)
+        self.game_ticks = 0
+
+        # Network input buffers consumed by feedforward, see sensors.sense()
+        self.offense_slots = sensors.slots(self.n_offense, self.n_defense, self.nearest)
+        self.defense_slots = sensors.slots(self.n_defense, self.n_offense, self.nearest)
+        self.offense_input = np.zeros((self.games, self.n_offense, sensors.inputs_size(*self.offense_slots)), DTYPE)
+        self.defense_input = np.zeros((self.games, self.n_defense, sensors.inputs_size(*self.defense_slots)), DTYPE)
+        # Last network output, repeated between decisions
+        self.offense_output = np.zeros((self.games, self.n_offense, self.offense.sizes[-1]), DTYPE)
+        self.defense_output = np.zeros((self.games, self.n_defense, self.defense.sizes[-1]), DTYPE)
+
+        # Distances shared between the offense and defense update (see Gridiron.net_input half_update)
+        self._distance = np.zeros((self.games, self.n_offense, self.n_defense))
+
+    def keep(self, games: np.ndarray):
+        """
+        Compacts the engine down to the given games, every other game stops being stepped
+
+        :param games: boolean mask or indices of the games to keep
+        """
+        self.offense_weights = [w[games] for w in self.offense_weights]
+        self.defense_weights = [w[games] for w in self.defense_weights]
+        for name in ("x", "y", "angle", "size", "has_ball", "in_play", "points", "plays", "advance", "game_ids",
+                     "best", "idle", "index", "offense_input", "defense_input", "offense_output", "defense_output",
+                     "_distance"):
+            setattr(self, name, getattr(self, name)[games])
+        self.games = len(self.points)
+
+    def run(self, ticks: int):
+        """
+        Runs every game for the given number of ticks, stopping early once every game is retired
+
+        :param ticks: number of ticks to run
+        """
+        for _ in range(ticks):
+            if not self.games:
+                break
+            self.step()
+
+    def step(self):
+        """
+        Advance every game by one tick. Games not in play place their teams for a new play,
+        all other games update the offense and then the defense.
+        """
+        live = self.in_play.copy()
+        if not live.all():
+            self.set_play(~live)
+
+        offense = slice(0, self.n_offense)
+        defense = slice(self.n_offense, None)
+        self.update_side(offense, defense, self.offense_weights, live)
+        self.update_side(defense, offense, self.defense_weights, live)
+
+        self.in_play |= ~live
+        if self.recorder is not None:
+            self.recorder.record_engine(self)
+        self.time += 1
+        self.game_ticks += self.games
+
+        if self.stall_ticks is not None:
+            score = self.points + self.advance
+            self.idle = np.where(score > self.best, 0, self.idle + 1)
+            np.maximum(self.best, score, out=self.best)
+        if self.play_budget is not None or self.stall_ticks is not None:
+            finished = self.finished()
+            if finished.any():
+                self.retire(finished)
+
+    def finished(self) -> np.ndarray:
+        """
+        Finds the games that used up their play budget or stalled
+
+        :return: boolean mask of the finished games
+        """
+        finished = np.zeros(self.games, dtype=bool)
+        if self.play_budget is not None:
+            finished |= self.plays - self.in_play >= self.play_budget
+        if self.stall_ticks is not None:
+            finished |= self.idle >= self.stall_ticks
+        return finished
+
+    def retire(self, games: np.ndarray):
+        """
+        Stores the outcome of the given games and compacts them out of the engine
+
+        :param games: boolean mask of the games to retire
+        """
+        rows = self.index[games]
+        self.final_points[rows] = self.points[games]
+        self.final_plays[rows] = self.plays[games] - self.in_play[games]
+        self.final_advance[rows] = self.advance[games]
+        self.keep(~games)
+
+    def results(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gets the outcome so far of every game paired, whether it is still being stepped or not
+
+        :return: points scored, plays completed and advance of each game in the order they were paired
+        """
+        points, plays, advance = self.final_points.copy(), self.final_plays.copy(), self.final_advance.copy()
+        points[self.index] = self.points
+        plays[self.index] = self.plays - self.in_play
+        advance[self.index] = self.advance
+        return points, plays, advance
+
+    def set_play(self, games: np.ndarray):
+        """
+        Place both teams for the start of a play in the given games, see Team.set_team()
+
+        :param games: boolean mask of the games to reset
+        """
+        width = (self.bounds[1] - self.bounds[0]) / 2
+        if self.scenarios is not None:
+            x, angle = self.scenarios.lookup(self.game_ids[games], self.plays[games])
+        else:
+            players = np.arange(self.x.shape[1])
+            x = hashed_uniform(self.seed, self.game_ids[games, None], self.plays[games, None], players)
+            angle = np.empty(self.x.shape[1])
+            angle[:self.n_offense] = OFFENSE_ANGLE
+            angle[self.n_offense:] = DEFENSE_ANGLE
+        x = x * width + 1.25 * self.bounds[0]
+        y = np.empty(self.x.shape[1])
+        y[:self.n_offense] = self.snap
+        y[self.n_offense:] = field.yard_to_pixel(20, self.height)
+
+        # Gridiron keeps positions in pygame.Rect, which truncates them to whole pixels
+        self.x[games] = np.trunc(x)
+        self.y[games] = np.trunc(y)
+        self.angle[games] = angle
+        self.size[games] = SIZE * SCALE
+        self.has_ball[games] = self.carrier
+        self.plays[games] += 1
+
+    def update_side(self, own: slice, opposing: slice, weights: list[np.ndarray], live: np.ndarray):
+        """
+        Updates one side of every game in play, the batched equivalent of Gridiron.update_team()
+
+        :param own: columns of the side being updated
+        :param opposing: columns of the side opposing it
+        :param weights: per layer network weights of the side being updated
+        :param live: boolean mask of the games that were in play at the start of the tick
+        """
+        x, y, angle, size = self.x[:, own], self.y[:, own], self.angle[:, own], self.size[:, own]
+        ox, oy, oangle, osize = self.x[:, opposing], self.y[:, opposing], self.angle[:, opposing], \
+            self.size[:, opposing]
+        speed, strength = self.speed[own], self.strength[own]
+        ostrength = self.strength[opposing]
+
+        # Collisions and pushes, see collision.py. Forces are only worked out for the pairs that collide
+        if self.nearest is None:
+            dx, dy = collision.offsets(x, y, ox, oy)
+            game, player, opponent = np.nonzero(collision.collide(dx, dy, size, osize))
+            force_x, force_y = collision.pair_forces(True, dx[game, player, opponent], dy[game, player, opponent],
+                                                     size[game, player], strength[player], ostrength[opponent],
+                                                     oangle[game, opponent])
+            player = game * x.shape[1] + player
+        else:
+            opponents, teammates = self.neighbours(own, opposing)
+            player, pair_dx, pair_dy, column = opponents
+            other = player // x.shape[1] * self.x.shape[1] + column
+            collided = np.flatnonzero(collision.collide_pairs(pair_dx, pair_dy, size.ravel()[player],
+                                                              self.size.ravel()[other]))
+            player, other = player[collided], other[collided]
+            force_x, force_y = collision.pair_forces(True, pair_dx[collided], pair_dy[collided],
+                                                     size.ravel()[player], strength[player % x.shape[1]],
+                                                     self.strength[column[collided]], self.angle.ravel()[other])
+        external_x = np.bincount(player, force_x, minlength=x.size).reshape(x.shape)
+        external_y = np.bincount(player, force_y, minlength=x.size).reshape(x.shape)
+        contact = np.bincount(player, minlength=x.size).reshape(x.shape) > 0
+
+        # Ball carrier, see Gridiron.check_game_state()
+        carrier = self.has_ball[:, own] & live[:, None]
+        tackled = (carrier & contact).any(axis=1)
+        touchdown = (carrier & (y <= self.score_endzone)).any(axis=1)
+        self.points += 7 * touchdown
+        self.in_play &= ~(tackled | touchdown)
+        if carrier.any():
+            carrier_y = np.where(carrier, y, np.inf).min(axis=1)
+            np.maximum(self.advance, (self.snap - carrier_y) / (self.snap - self.score_endzone), out=self.advance)
+
+        # Network input and output, see sensors.sense() and Network.feedforward(). Both only run on the ticks
+        # a decision is made, the last output is repeated in between
+        output = self.offense_output if own.start == 0 else self.defense_output
+        if self.time % self.decision_interval == 0:
+            net_input = self.offense_input if own.start == 0 else self.defense_input
+            if self.nearest is not None:
+                sensors.sense_nearest(x, y, angle, opponents, teammates,
+                                      self.offense_slots if own.start == 0 else self.defense_slots,
+                                      self.bounds, self.score_endzone, self.max_dist, self.radius, net_input)
+            elif own.start == 0:
+                self._distance = sensors.sense(x, y, angle, dx, dy, self.bounds, self.score_endzone,
+                                               self.max_dist, net_input)
+            else:
+                sensors.sense(x, y, angle, dx, dy, self.bounds, self.score_endzone, self.max_dist, net_input,
+                              distance=self._distance.transpose(0, 2, 1))
+            output[...] = feedforward(weights, net_input)
+        move, turn = output[..., 0], output[..., 1]
+
+        # Movement, see Player.update()
+        angle = np.where(turn < 0.25, (angle + 2 * speed) % 360, angle)
+        angle = np.where(turn > 0.75, (angle - 2 * speed) % 360, angle)
+        moving = (move > 0.50) & live[:, None]
+        radian = np.radians(angle)
+        new_x = x + np.cos(radian) * speed + external_x
+        new_y = y + np.sin(radian) * -speed + external_y
+        x = np.where(moving & (self.bounds[1] > new_x) & (new_x > self.bounds[0]), np.trunc(new_x), x)
+        y = np.where(moving & (self.height > new_y) & (new_y > 0), np.trunc(new_y), y)
+
+        live = live[:, None]
+        self.x[:, own] = x
+        self.y[:, own] = y
+        self.angle[:, own] = np.where(live, angle, self.angle[:, own])
+        self.size[:, own] = np.where(live, np.trunc(rotated_size(self.angle[:, own])), size)
+
+    def neighbours(self, own: slice, opposing: slice) -> tuple[tuple, tuple]:
+        """
+        Pairs every player of one side with the players near them on a spatial.neighbours() grid
+
+        :param own: columns of the side being updated
+        :param opposing: columns of the side opposing it
+        :return: (player, dx, dy, column) of the nearby opponents and of the nearby teammates, player indexing
+        the flattened (games, side players) arrays of the side, see sensors.sense_nearest()
+        """
+        columns = np.arange(self.x.shape[1])
+        owner, other = spatial.neighbours(self.x, self.y, columns[own], self.bounds, self.height, self.radius)
+        x, y = self.x.ravel(), self.y.ravel()
+        dx, dy = x[other] - x[owner], y[other] - y[owner]
+        player = owner // len(columns) * len(columns[own]) + owner % len(columns) - own.start
+        column = other % len(columns)
+        opponent = np.zeros(len(columns), dtype=bool)
+        opponent[opposing] = True
+        opponent = opponent[column]
+        teammate = ~opponent
+        return (player[opponent], dx[opponent], dy[opponent], column[opponent]), \
+            (player[teammate], dx[teammate], dy[teammate], column[teammate])
+
+
+def hashed_uniform(seed, *keys):
+    """
+    Counter based random numbers in [0, 1). Every combination of keys maps to its own number,
+    so results don't depend on how many other games are drawn for at the same time.
+
+    :param seed: seed of the stream
+    :param keys: integer arrays broadcast against each other, such as game id, play number and player
+    :return: array of uniform random numbers
+    """
+    z = np.array([seed], dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    for key, multiplier in zip(keys, (0xBF58476D1CE4E5B9, 0x94D049BB133111EB, 0xD6E8FEB86659FD93)):
+        z = z + np.asarray(key, dtype=np.uint64) * np.uint64(multiplier)
+    # splitmix64 finalizer
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)) * (1.0 / 2 ** 53)
+
+
+def rotated_size(angle):
+    """
+    Width of the bounding box of a player's sprite after being rotated to face the given angle,
+    the array equivalent of physics.get_rotated_size()
+
+    :param angle: angle the player faces in degrees
+    :return: width and height of the rotated sprite's rect
+    """
+    radian = np.radians(angle)
+    return SIZE * SCALE * (np.abs(np.cos(radian)) + np.abs(np.sin(radian)))
@@ -0,0 +1,333 @@
+from time import perf_counter
+import numpy as np
+import checkpoint
+import field
+import team
+import parallel
+from checkpoint import Checkpoint
+from engine import Engine
+from fitness_cache import FitnessCache, team_hashes
+from metrics import Instruments
+from neural_net import Population
+from physics import DECISION_INTERVAL
+from racing import race
+from recorder import TOP, Recorder
+from reproduction import Reproduction, child_rows
+from scenarios import ScenarioTable
+
+SCREEN_SIZE = (1200, 700)
+FIELD_BOUNDS = (SCREEN_SIZE[0] / 4, SCREEN_SIZE[0] * 3 / 4)
+POPULATION = 350
+TICKS = 600
+OPPONENTS = 1
+
+
+class Evolution:
+    """
+    Headless version of the evolution run by main.main(). Every generation each offense plays a number of
+    randomly paired defenses on the Engine, then the selection step keeps the best half of each side
+    and breeds the rest from the winners, see reproduction.Reproduction.
+    Every matchup is its own game, so playing more opponents only adds rows to the Engine's batch.
+    """
+    def __init__(self, population=POPULATION, seed=None, workers=0, ticks=TICKS, racing=None, players=team.PLAYERS,
+                 nearest=None, hidden=None, selection="top", crossover=None, recorder=None, opponents=OPPONENTS,
+                 decision_interval=DECISION_INTERVAL, play_budget=None, stall_ticks=None, scenarios=None,
+                 fitness_cache=False):
+        """
+        :param population: number of winners kept each generation, twice as many teams play
+        :param seed: seed for every random choice of the run
+        :param workers: number of worker processes to evaluate games on, 0 plays them in this process
+        :param ticks: ticks each game is played for
+        :param racing: ticks of each round of successive halving, see racing.race(). Their sum is the tick budget
+        of the games that make the selection, defaults to playing every game for ticks in one round
+        :param players: players per side, a key of team.FORMATIONS
+        :param nearest: number of nearest opponents and teammates each player senses, None senses every opponent
+        :param hidden: offense and defense hidden layer sizes, defaults to team.OFFENSE_HIDDEN and team.DEFENSE_HIDDEN
+        :param selection: how parents are picked, a value of reproduction.SELECTIONS
+        :param crossover: how parents are mixed, a value of reproduction.CROSSOVERS, None copies one parent
+        :param recorder: recorder.Recorder to record the first game and the top games of every generation with,
+        only games played in this process can be recorded
+        :param opponents: number of opponents each team plays every generation, fitness is the points
+        summed over its games
+        :param decision_interval: ticks between network decisions, the last decision is repeated in between
+        :param play_budget: plays after which a game is finished, None plays every game for the whole tick budget
+        :param stall_ticks: ticks after which a game that neither scored nor carried the ball further than before
+        is finished, None never finishes stalled games
+        :param scenarios: number of scenarios in a scenarios.ScenarioTable drawn from the seed that every game
+        picks its starting positions from, None draws new starting positions for every game
+        :param fitness_cache: whether games between two teams that survived unchanged are replayed on the same
+        scenario and take their outcome from a fitness_cache.FitnessCache instead of being played again
+        """
+        if recorder is not None and workers:
+            raise ValueError("games played by worker processes can't be recorded")
+        if not 1 <= opponents <= 2 * population:
+            raise ValueError("opponents must be between 1 and the number of teams")
+        if fitness_cache and (scenarios is None or racing or recorder is not None):
+            raise ValueError("the fitness cache needs scenarios and can't be combined with racing or recording")
+        self.rng = np.random.RandomState(seed)
+        self.recorder = recorder
+        self.rounds = list(racing) if racing else [ticks]
+        self.plays = None
+        self.game_ticks = 0
+        self.teams = 2 * population
+        self.opponents = opponents
+        self.players = players
+        self.nearest = nearest
+        self.decision_interval = decision_interval
+        self.play_budget = play_budget
+        self.stall_ticks = stall_ticks
+        self.scenarios = ScenarioTable(players, scenarios, seed=self.rng.randint(2 ** 31)) if scenarios else None
+        self.cache = FitnessCache() if fitness_cache else None
+        self.scenario_index = None
+        self.offense_size, self.defense_size = team.team_sizes(players)
+        offense_sizes, defense_sizes = team.network_sizes(players, nearest, hidden)
+        self.offense = Population(self.teams * self.offense_size, offense_sizes, rng=self.rng)
+        self.defense = Population(self.teams * self.defense_size, defense_sizes, rng=self.rng)
+
+        self.evaluator = None
+        if workers:
+            self.evaluator = parallel.ParallelEvaluator(self.offense, self.defense, FIELD_BOUNDS,
+                                                        SCREEN_SIZE[1], workers, players, nearest,
+                                                        decision_interval, play_budget, stall_ticks,
+                                                        self.scenarios)
+            self.offense, self.defense = self.evaluator.offense, self.evaluator.defense
+        self.offense_reproduction = Reproduction(self.offense, self.offense_size, selection, crossover)
+        self.defense_reproduction = Reproduction(self.defense, self.defense_size, selection, crossover)
+        self.offense_fitness = np.zeros(self.teams)
+        self.defense_fitness = np.zeros(self.teams)
+
+        self.generation = 0
+        self.points = None
+        self.offense_index = None
+        self.defense_index = None
+        self.offense_winners = None
+        self.defense_winners = None
+
+    def run(self, generations: int):
+        """
+        Runs the given number of generations
+
+        :param generations: number of generations to run
+        """
+        for _ in range(generations):
+            self.step()
+
+    def step(self):
+        """
+        Plays and selects one generation
+        """
+        self.generation += 1
+        if self.cache is not None:
+            self.step_cached()
+            return
+        self.offense_index, self.defense_index = pairings(self.rng, self.teams, self.opponents)
+        if self.scenarios is not None:
+            self.scenario_index = self.rng.randint(self.scenarios.count, size=len(self.offense_index))
+        seed = self.rng.randint(2 ** 31)
+        self.points = self.evaluate(self.offense_index, self.defense_index, seed, self.scenario_index)
+        if self.recorder is not None:
+            self.recorder.finish(self.generation, self.points, self.offense_index, self.defense_index)
+        self.select(self.points, self.offense_index, self.defense_index)
+
+    def step_cached(self):
+        """
+        Plays and selects one generation with the fitness cache. Every game between two teams that both
+        survived the last selection unchanged is kept along with its scenario and its outcome is taken from
+        the cache, only the games of the other teams are played.
+        """
+        offense_hashes = team_hashes(self.offense, self.teams)
+        defense_hashes = team_hashes(self.defense, self.teams)
+        offense, defense, scenario = self.cache.rematches(offense_hashes, defense_hashes, self.opponents)
+
+        # Every team plays self.opponents games, the rematches count towards them
+        offense_slots = np.repeat(np.arange(self.teams), self.opponents - np.bincount(offense, minlength=self.teams))
+        defense_slots = np.repeat(np.arange(self.teams), self.opponents - np.bincount(defense, minlength=self.teams))
+        self.offense_index = np.concatenate([offense, self.rng.permutation(offense_slots)])
+        self.defense_index = np.concatenate([defense, self.rng.permutation(defense_slots)])
+        self.scenario_index = np.concatenate([scenario, self.rng.randint(self.scenarios.count,
+                                                                         size=len(offense_slots))])
+        seed = self.rng.randint(2 ** 31)
+
+        keys = [(offense_hashes[o], defense_hashes[d], s)
+                for o, d, s in zip(self.offense_index, self.defense_index, self.scenario_index)]
+        found, self.points, plays = self.cache.lookup(keys)
+        missing = ~found
+        self.game_ticks = 0
+        if missing.any():
+            self.points[missing] = self.evaluate(self.offense_index[missing], self.defense_index[missing], seed,
+                                                 self.scenario_index[missing])
+            plays[missing] = self.plays
+        self.plays = plays
+        self.cache.store(keys, self.points, self.plays)
+        self.select(self.points, self.offense_index, self.defense_index)
+
+    def evaluate(self, offense_index: np.ndarray, defense_index: np.ndarray, seed: int,
+                 scenario_index=None) -> np.ndarray:
+        """
+        Plays every game in the rounds of self.rounds, dropping games that clearly can't make the selection
+        and games that finished early, see Engine.retire().
+        The plays completed in each game and the number of game ticks simulated are kept in self.plays
+        and self.game_ticks.
+
+        :param offense_index: offense team playing each game
+        :param defense_index: defense team playing each game
+        :param seed: seed for the random starting positions
+        :param scenario_index: scenario of each game when playing scenarios
+        :return: points scored in each game
+        """
+        if self.evaluator is not None:
+            points, self.plays, self.game_ticks = self.evaluator.evaluate(offense_index, defense_index, seed,
+                                                                          self.rounds, scenario_index)
+            return points
+        engine = Engine(self.offense, self.defense, FIELD_BOUNDS, SCREEN_SIZE[1],
+                        offense_index, defense_index, seed=seed, players=self.players, nearest=self.nearest,
+                        decision_interval=self.decision_interval, play_budget=self.play_budget,
+                        stall_ticks=self.stall_ticks, game_ids=scenario_index, scenarios=self.scenarios)
+        if self.recorder is not None:
+            self.recorder.start(engine.games, sum(self.rounds), engine.x.shape[1])
+            engine.recorder = self.recorder
+        points, self.plays, self.game_ticks = race(engine, self.rounds, len(offense_index) // 2)
+        return points
+
+    def select(self, points: np.ndarray, offense_index: np.ndarray, defense_index: np.ndarray):
+        """
+        Keeps the offenses that scored the most points and the defenses that allowed the fewest over all their
+        games, then breeds the other teams from them like main.main() does. The kept teams stay in their rows.
+
+        :param points: points scored in each game
+        :param offense_index: offense team playing each game
+        :param defense_index: defense team playing each game
+        """
+        self.offense_fitness[:] = np.bincount(offense_index, points, minlength=self.teams)
+        self.defense_fitness[:] = -np.bincount(defense_index, points, minlength=self.teams)
+        self.offense_winners = self.offense_reproduction.reproduce(self.offense_fitness, self.rng.randint(2 ** 31))
+        self.defense_winners = self.defense_reproduction.reproduce(self.defense_fitness, self.rng.randint(2 ** 31))
+
+    def emigrants(self, count: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Copies the genomes of the best teams of each side kept by select()
+
+        :param count: number of teams of each side
+        :return: offense and defense genomes, one team per row, best first
+        """
+        return self.offense.genome.reshape(self.teams, -1)[self.offense_winners[:count]], \
+            self.defense.genome.reshape(self.teams, -1)[self.defense_winners[:count]]
+
+    def immigrate(self, offense: np.ndarray, defense: np.ndarray):
+        """
+        Overwrites the last children bred by select() with teams from another run, see reproduction.child_rows()
+
+        :param offense: offense genomes from emigrants(), one team per row
+        :param defense: defense genomes from emigrants(), one team per row
+        """
+        for population, genomes, winners in ((self.offense, offense, self.offense_winners),
+                                             (self.defense, defense, self.defense_winners)):
+            teams = population.genome.reshape(self.teams, -1)
+            teams[child_rows(winners, self.teams)[len(winners) - len(genomes):]] = genomes
+
+    def checkpoint(self) -> Checkpoint:
+        """
+        Gets the state of the run after the last generation
+
+        :return: checkpoint referencing the current weights
+        """
+        return Checkpoint(self.generation, self.offense.weights, self.defense.weights, self.points,
+                          self.offense_index, self.defense_index, self.offense_winners, self.defense_winners,
+                          self.rng.get_state(),
+                          fitness_cache=self.cache.state() if self.cache is not None else None)
+
+    def restore(self, checkpoint: Checkpoint):
+        """
+        Continues the run from a checkpoint
+
+        :param checkpoint: checkpoint of a run with the same population size
+        """
+        for population, weights in ((self.offense, checkpoint.offense), (self.defense, checkpoint.defense)):
+            if [w.shape for w in population.weights] != [w.shape for w in weights]:
+                raise ValueError("checkpoint population does not match this run")
+            for w, saved in zip(population.weights, weights):
+                w[...] = saved
+        self.generation = checkpoint.generation
+        self.points = checkpoint.points
+        self.offense_index = checkpoint.offense_index
+        self.defense_index = checkpoint.defense_index
+        self.offense_winners = checkpoint.offense_winners
+        self.defense_winners = checkpoint.defense_winners
+        if checkpoint.rng_state is not None:
+            self.rng.set_state(checkpoint.rng_state)
+        if self.cache is not None and checkpoint.fitness_cache is not None:
+            self.cache.restore(*checkpoint.fitness_cache)
+
+    def close(self):
+        """
+        Stops any worker processes
+        """
+        if self.evaluator is not None:
+            self.evaluator.close()
+
+
+def run_evolution(config: dict, report=None) -> Evolution:
+    """
+    Library entry point running the evolution without a display on the batched engine. Only NumPy is loaded,
+    pygame never is, so it runs on machines without a display and any worker processes start quickly.
+
+    :param config: keyword arguments of Evolution, plus generations (the number of generations to run, None runs
+    until interrupted), checkpoint_dir, deltas, resume, metrics, record and record_top, see main.headless()
+    :param report: called with the run after every generation, such as to print progress
+    :return: the run after its last generation, with its worker processes stopped
+    """
+    config = dict(config)
+    generations = config.pop("generations", None)
+    checkpoint_dir = config.pop("checkpoint_dir", None)
+    deltas = config.pop("deltas", False)
+    resume = config.pop("resume", None)
+    metrics = config.pop("metrics", None)
+    record = config.pop("record", None)
+    record_top = config.pop("record_top", TOP)
+    players = config.get("players", team.PLAYERS)
+
+    saved = checkpoint.load(resume) if resume is not None else None
+    if saved is not None:
+        config["population"] = len(saved.offense[0]) // team.team_sizes(players)[0] // 2
+    if record is not None:
+        config["recorder"] = Recorder(record, players, SCREEN_SIZE, FIELD_BOUNDS,
+                                      field.yard_to_pixel(70, SCREEN_SIZE[1]), record_top)
+    run = Evolution(**config)
+    if saved is not None:
+        run.restore(saved)
+    checkpointer = checkpoint.Checkpointer(checkpoint_dir, deltas) if checkpoint_dir is not None else None
+    instruments = Instruments(metrics) if metrics is not None else None
+    if instruments is not None:
+        instruments.instrument_engine()
+    try:
+        while generations is None or run.generation < generations:
+            generation_start = perf_counter()
+            run.step()
+            if report is not None:
+                report(run)
+            if instruments is not None:
+                instruments.generation(run.generation, run.points, run.plays, run.game_ticks,
+                                       perf_counter() - generation_start)
+            if checkpointer is not None:
+                checkpointer.save(run.checkpoint())
+    finally:
+        run.close()
+        if instruments is not None:
+            instruments.close()
+    return run
+
+
+def pairings(rng: np.random.RandomState, teams: int, opponents: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Randomly pairs every offense with a number of different defenses. The offenses are shuffled once and
+    the defenses are shuffled once then rotated by one for each extra opponent, so every team of both sides
+    plays exactly the given number of games.
+
+    :param rng: random state to shuffle with
+    :param teams: number of teams of each side
+    :param opponents: number of games each team plays, at most teams
+    :return: offense team and defense team playing each game, the games of each opponent one after another
+    """
+    offense = rng.permutation(teams)
+    defense = rng.permutation(teams)
+    return np.tile(offense, opponents), np.concatenate([np.roll(defense, -i) for i in range(opponents)])
@@ -1,10 +1,35 @@
-import pygame
-
+# pygame is imported by the drawing functions alone, so yard_to_pixel() can be used without it
 WHITE = (255, 255, 255)
 BLUE = (0, 0, 255)
 RED = (255, 0, 0)
+GRASS = (24, 150, 0)
+
+# Background and field drawn once per window size, see get_field_surface()
+field_cache = {}
 
-def draw_field(left_bound: float, right_bound: float, screen: pygame.Surface):
+
+def get_field_surface(size: tuple[int, int], bounds: tuple[float, float]) -> "pygame.Surface":
+    """
+    Gets a surface with the grass and the field from draw_field() already drawn on it. It is drawn once
+    and reused every frame, only being redrawn when asked for a different window size or bounds.
+
+    :param size: size of the display window
+    :param bounds: x coordinates bounding the field on screen
+    :return: the field surface
+    """
+    import pygame
+
+    key = (tuple(size), tuple(bounds))
+    if key not in field_cache:
+        field_cache.clear()
+        surface = pygame.Surface(size).convert()
+        surface.fill(GRASS)
+        draw_field(bounds[0], bounds[1], surface)
+        field_cache[key] = surface
+    return field_cache[key]
+
+
+def draw_field(left_bound: float, right_bound: float, screen: "pygame.Surface"):
     """
     Draws the field onto the screen
 
@@ -12,6 +37,8 @@ def draw_field(left_bound: float, right_bound: float, screen: pygame.Surface):
     :param right_bound: x coordinate where field ends on screen
     :param screen: surface object of display window
     """
+    import pygame
+
     height = screen.get_height()
 
     pixels_per_yard = height / 120
@@ -47,7 +74,7 @@ def draw_field(left_bound: float, right_bound: float, screen: pygame.Surface):
     screen.blit(surface, (right_bound, 0))
 
 
-def draw_line_from_yard(yard: int, bounds: tuple[float, float], screen: pygame.Surface, offset=10, color=WHITE):
+def draw_line_from_yard(yard: int, bounds: tuple[float, float], screen: "pygame.Surface", offset=10, color=WHITE):
     """
     Draws a line horizontally across the field at the given yardage
 
@@ -57,13 +84,15 @@ def draw_line_from_yard(yard: int, bounds: tuple[float, float], screen: pygame.S
     :param offset: yards added to given yards, defaults 10 to offset space used by the end zone
     :param color: RGB value of the line
     """
+    import pygame
+
     pixels_per_yard = screen.get_height() / 120
     start = (bounds[0], (yard + offset) * pixels_per_yard)
     end = (bounds[1], (yard + offset) * pixels_per_yard)
     pygame.draw.line(screen, color, start, end, 2)
 
 
-def draw_line_from_pixel(pixel: float, bounds: tuple[float, float], screen: pygame.Surface, color=(255, 255, 255)):
+def draw_line_from_pixel(pixel: float, bounds: tuple[float, float], screen: "pygame.Surface", color=(255, 255, 255)):
     """
     Draws a line horizontally across the field at the given y coordinate/pixel
 
@@ -71,10 +100,13 @@ def draw_line_from_pixel(pixel: float, bounds: tuple[float, float], screen: pyga
     :param bounds: X coordinates bounding the field on screen
     :param screen: surface object of display window
     :param color: RGB value of the line
+    :return: rect of the screen the line was drawn onto
     """
+    import pygame
+
     start = (bounds[0], pixel)
     end = (bounds[1], pixel)
-    pygame.draw.line(screen, color, start, end, 2)
+    return pygame.draw.line(screen, color, start, end, 2)
 
 
 def yard_to_pixel(yard: int, height: float, offset=10):
@@ -0,0 +1,110 @@
+import hashlib
+import numpy as np
+from neural_net import Population
+
+DIGEST_SIZE = 16
+
+
+def team_hashes(population: Population, teams: int) -> list[bytes]:
+    """
+    Hashes the genome of every team of a population
+
+    :param population: population holding whole teams of consecutive rows
+    :param teams: number of teams in the population
+    :return: digest of each team's genome
+    """
+    return [hashlib.blake2b(row.tobytes(), digest_size=DIGEST_SIZE).digest() for row in population.genome.reshape(teams, -1)]
+
+
+class FitnessCache:
+    """
+    Outcome of the games of the last generation keyed by the genome hashes of both teams and the scenario played,
+    see scenarios.ScenarioTable. A game's outcome only depends on those, so a game between two teams that
+    survived selection unchanged can reuse its outcome instead of being played again. Only the last generation
+    is kept, so the cache never grows beyond one generation's games.
+    """
+    def __init__(self):
+        self.outcomes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def rematches(self, offense_hashes: list[bytes], defense_hashes: list[bytes], games: int) \
+            -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the cached games whose teams are both still in the populations
+
+        :param offense_hashes: genome hash of each offense team
+        :param defense_hashes: genome hash of each defense team
+        :param games: most games any team plays
+        :return: offense team, defense team and scenario of each game that can be replayed from the cache
+        """
+        offense_rows = {digest: row for row, digest in reversed(list(enumerate(offense_hashes)))}
+        defense_rows = {digest: row for row, digest in reversed(list(enumerate(defense_hashes)))}
+        offense_games = np.zeros(len(offense_hashes), dtype=np.int64)
+        defense_games = np.zeros(len(defense_hashes), dtype=np.int64)
+        found = []
+        for offense, defense, scenario in self.outcomes:
+            o, d = offense_rows.get(offense), defense_rows.get(defense)
+            if o is None or d is None or offense_games[o] >= games or defense_games[d] >= games:
+                continue
+            offense_games[o] += 1
+            defense_games[d] += 1
+            found.append((o, d, scenario))
+        found = np.array(found, dtype=np.int64).reshape(-1, 3)
+        return found[:, 0], found[:, 1], found[:, 2]
+
+    def lookup(self, keys: list[tuple]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gets the cached outcome of games
+
+        :param keys: (offense hash, defense hash, scenario) of each game
+        :return: boolean mask of the games found, and the points scored and plays completed in them
+        """
+        found = np.zeros(len(keys), dtype=bool)
+        points = np.zeros(len(keys))
+        plays = np.zeros(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            outcome = self.outcomes.get(key)
+            if outcome is not None:
+                found[i] = True
+                points[i], plays[i] = outcome
+        self.hits += int(found.sum())
+        self.misses += len(keys) - int(found.sum())
+        return found, points, plays
+
+    def store(self, keys: list[tuple], points: np.ndarray, plays: np.ndarray):
+        """
+        Replaces the cache with the outcome of this generation's games
+
+        :param keys: (offense hash, defense hash, scenario) of each game
+        :param points: points scored in each game
+        :param plays: plays completed in each game
+        """
+        self.outcomes = {key: (float(p), int(n)) for key, p, n in zip(keys, points, plays)}
+
+    def state(self) -> tuple[np.ndarray, ...]:
+        """
+        Gets the cached outcomes as arrays, such as to save them in a checkpoint.Checkpoint
+
+        :return: offense hashes and defense hashes shaped (games, DIGEST_SIZE), and the scenario, points and plays
+        of each cached game, in the order the games were stored
+        """
+        offense = np.frombuffer(b"".join(o for o, _, _ in self.outcomes), dtype=np.uint8).reshape(-1, DIGEST_SIZE)
+        defense = np.frombuffer(b"".join(d for _, d, _ in self.outcomes), dtype=np.uint8).reshape(-1, DIGEST_SIZE)
+        scenario = np.array([s for _, _, s in self.outcomes], dtype=np.int64)
+        points = np.array([p for p, _ in self.outcomes.values()], dtype=float)
+        plays = np.array([n for _, n in self.outcomes.values()], dtype=np.int64)
+        return offense, defense, scenario, points, plays
+
+    def restore(self, offense: np.ndarray, defense: np.ndarray, scenario: np.ndarray, points: np.ndarray,
+                plays: np.ndarray):
+        """
+        Replaces the cache with outcomes from state()
+
+        :param offense: offense hash of each game
+        :param defense: defense hash of each game
+        :param scenario: scenario of each game
+        :param points: points scored in each game
+        :param plays: plays completed in each game
+        """
+        self.store([(bytes(o), bytes(d), int(s)) for o, d, s in zip(offense, defense, scenario)], points, plays)
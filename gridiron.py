@@ -1,13 +1,39 @@
 from team import *
+import math
 import field
+import collision
+import sensors
+import numpy as np
+from neural_net import DTYPE
 from player import *
 
+# Network input buffers filled by update_games() for each side of the games in play and of the games starting
+# a play, kept until the number of those games changes
+input_buffers = {}
+
 
 class Gridiron:
     """
     Object for controlling a game between two teams, an offense and defense
     """
-    def __init__(self, offense: Offense, defense: Defense, bounds: tuple[float, float], screen: pygame.Surface):
+    def __init__(self, offense: Offense, defense: Defense, bounds: tuple[float, float], screen: pygame.Surface,
+                 nearest=None, decision_interval=DECISION_INTERVAL, play_budget=None, stall_ticks=None,
+                 scenarios=None, scenario=0):
+        """
+        :param offense: offense playing the game
+        :param defense: defense playing the game
+        :param bounds: x coordinate bounds for the field
+        :param screen: surface the game is drawn onto
+        :param nearest: number of nearest opponents and teammates players sense, see sensors.sense_nearest().
+        None senses every opponent
+        :param decision_interval: ticks between network decisions, players sense and run their networks
+        on every tick that is a multiple of it and repeat their last decision in between
+        :param play_budget: plays after which the game is finished, None plays until the game stops being updated
+        :param stall_ticks: ticks after which a game that neither scored nor carried the ball further than before
+        is finished, None never finishes a stalled game
+        :param scenarios: scenarios.ScenarioTable plays start from, None places players at random
+        :param scenario: scenario of the table the game plays
+        """
         # Display
         self.screen = screen
         self.display = False
@@ -23,10 +49,26 @@ class Gridiron:
         saftey_endzone = field.yard_to_pixel(110, self.height, offset=0)
         self.max_dist = math.sqrt((self.bounds[1] - self.bounds[0]) ** 2 + (self.score_endzone - saftey_endzone) ** 2)
         self.scrimmage = field.yard_to_pixel(70, self.height)
+        self.snap = field.yard_to_pixel(80, self.height)
+        self.nearest = nearest
+        self.radius = field.yard_to_pixel(sensors.SENSE_YARDS, self.height, offset=0)
+        self.decision_interval = decision_interval
+        self.play_budget = play_budget
+        self.stall_ticks = stall_ticks
+        self.scenarios = scenarios
+        self.scenario = scenario
 
         # Game state
         self.in_play = False
         self.points = 0
+        self.plays = 0
+        self.time = 0
+
+        # Stall detection, advance is the furthest fraction of the way to the end zone the ball got,
+        # best the highest points plus advance so far and idle the ticks since it went up
+        self.advance = 0
+        self.best = 0
+        self.idle = 0
 
     def update(self):
         """
@@ -35,66 +77,95 @@ class Gridiron:
 
         This will only render updates if the Gridiron object's display attribute is True
         """
-        offense_players = self.offense.players
-        defensive_players = self.defense.players
-        if self.in_play:
-            # allow teams to update
-            self.update_team(self.offense, self.defense)
-            self.update_team(self.defense, self.offense, half_update=True)
+        update_games([self])
+
+    @property
+    def finished(self) -> bool:
+        """
+        Whether the game used up its play budget or stalled, finished games are no longer updated
+        """
+        return (self.play_budget is not None and self.plays - self.in_play >= self.play_budget) or \
+            (self.stall_ticks is not None and self.idle >= self.stall_ticks)
+
+    def track_progress(self):
+        """
+        Counts the ticks since the game last scored or carried the ball further than before
+        """
+        score = self.points + self.advance
+        self.idle = 0 if score > self.best else self.idle + 1
+        self.best = max(self.best, score)
+
+    def start_play(self):
+        """
+        allow teams to place themselves and flip the self.in_play flag
+        """
+        if self.scenarios is not None:
+            x, angle = self.scenarios.lookup(self.scenario, self.plays)
+            size = len(self.offense.players)
+            self.offense.set_offense(self.bounds, self.height, x[:size], angle[:size])
+            self.defense.set_defense(self.bounds, self.height, x[size:], angle[size:])
         else:
-            # allow teams to place themselves and flip the self.in_play flag
             self.offense.set_offense(self.bounds, self.height)
             self.defense.set_defense(self.bounds, self.height)
-            self.in_play = True
+        self.in_play = True
+        self.plays += 1
+
+    def draw(self) -> list[pygame.Rect]:
+        """
+        render players and line of self.scrimmage
 
-        if self.display:
-            # render players and line of self.scrimmage
-            field.draw_line_from_pixel(self.scrimmage, self.bounds, self.screen, color=(0, 0, 255))
-            offense_players.draw(self.screen)
-            defensive_players.draw(self.screen)
+        :return: rects of the screen drawn onto, for pygame.display.update()
+        """
+        drawn = [field.draw_line_from_pixel(self.scrimmage, self.bounds, self.screen, color=(0, 0, 255))]
+        for players in (self.offense.players, self.defense.players):
+            players.draw(self.screen)
+            drawn.extend(player.image.get_rect(topleft=player.rect.topleft) for player in players)
+        return drawn
 
-    def update_team(self, update_team: Offense | Defense, opposing_team: Offense | Defense, half_update=False):
+    def update_team(self, update_team: Offense | Defense, opposing_team: Offense | Defense, half_update=False,
+                    contacts=None, net_inputs=None, decide=True):
         """
         Updates each player in the team by checking if they contact the given opposing team.
 
         1. update players network input
         2. check player for collisions and has_ball/check_game_state
-        3. if it is colliding, calculate external forces
+        3. apply external forces from colliding opponents
         4. call players update function Player.update()
 
         :param update_team: team whose players will be updated
         :param opposing_team: team is opposing the team being updated
         :param half_update: whether to use the half_update argument of gridiron.net_input()
+        :param contacts: this game's (collided, force_x, force_y) from resolve_contacts(),
+        defaults to resolving them for this game alone
+        :param net_inputs: this game's rows of the input buffer filled by sensors.sense(),
+        defaults to running net_input() for each player
+        :param decide: whether players sense and run their networks, otherwise they repeat their last decision
         """
-        c = pygame.sprite.collide_rect_ratio(0.80)
-        collided = pygame.sprite.groupcollide(update_team.players, opposing_team.players, False, False, collided=c)
+        if contacts is None:
+            contacts = [c[0] for c in resolve_contacts(gather([update_team]), gather([opposing_team]))[:3]]
+        collided, force_x, force_y = contacts
 
-        for player in update_team.players:
-            self.net_input(player, opposing_team, half_update)
+        for i, player in enumerate(update_team.players):
+            if net_inputs is not None:
+                player.net_input = net_inputs[i]
+            elif decide:
+                self.net_input(player, opposing_team, half_update)
 
-            try:
-                if player.has_ball:
-                    self.check_game_state(player, collided)
+            if player.has_ball:
+                self.check_game_state(player, collided[i].any())
 
-                external_force = [0, 0]
-                for opponent in collided[player]:
-                    corners = opponent.get_face_corners()
-                    if player.rect.clipline(corners) and opponent.strength >= player.strength:
-                        x, y = get_movement_vector(opponent.strength, opponent.angle)
-                        external_force[0] += 2 * x
-                        external_force[1] += 2 * y
-                player.update(self.bounds, self.height, external_force=external_force)
-            except KeyError:
-                player.update(self.bounds, self.height)
+            player.update(self.bounds, self.height, external_force=(force_x[i], force_y[i]), render=self.display,
+                          decide=decide)
 
-    def check_game_state(self, player: Player, collisions: dict):
+    def check_game_state(self, player: Player, collided: bool):
         """
         checks and updates the state of the game based on the player with the ball
 
         :param player: Player object with the ball
-        :param collisions: dict of collisions returned by pygame.sprite.groupcollide()
+        :param collided: whether the player is colliding with an opponent, see collision.collide()
         """
-        if player in collisions.keys():
+        self.advance = max(self.advance, (self.snap - player.rect.centery) / (self.snap - self.score_endzone))
+        if collided:
             self.in_play = False
         if player.rect.centery <= self.score_endzone:
             self.in_play = False
@@ -133,3 +204,144 @@ class Gridiron:
             diff = (self.bounds[corner] - player.rect.centerx, self.score_endzone - player.rect.centery)
             player.net_input[-2 * (2 - corner)] = math.sqrt(diff[0] ** 2 + diff[1] ** 2) / self.max_dist
             player.net_input[-2 * (2 - corner) + 1] = vision_to_obj(vision, diff)
+
+
+def update_games(games: list[Gridiron]) -> list[pygame.Rect]:
+    """
+    Updates every unfinished game like Gridiron.update(), resolving collisions, pushes and network input
+    for all games in play at once. The offense of every game updates before any defense
+    so the defense sees where the offense moved. Network input is only worked out on the ticks
+    some game makes a decision on, see Gridiron.decision_interval. Games starting a play on such a tick
+    decide from their starting positions, so every game decides on the same ticks as it would on the Engine.
+
+    :param games: games to update, all on the same field
+    :return: rects of the screen drawn onto by the displayed games
+    """
+    live = [game for game in games if not game.finished]
+    playing = [game for game in live if game.in_play]
+    starting = [game for game in live if not game.in_play]
+    if playing:
+        field_state = playing[0]
+        distance = None
+        decide = [game.time % game.decision_interval == 0 for game in playing]
+        for side, half_update in (("offense", False), ("defense", True)):
+            teams = [getattr(game, side) for game in playing]
+            opponents = [game.defense if side == "offense" else game.offense for game in playing]
+            own, opposing = gather(teams), gather(opponents)
+            collided, force_x, force_y, dx, dy = resolve_contacts(own, opposing)
+
+            net_inputs = None
+            if any(decide):
+                net_inputs, distance = sense_games(field_state, side, own, dx, dy,
+                                                   distance if half_update else None)
+
+            for i, (game, update_team, opposing_team) in enumerate(zip(playing, teams, opponents)):
+                game.update_team(update_team, opposing_team, half_update,
+                                 contacts=(collided[i], force_x[i], force_y[i]),
+                                 net_inputs=None if net_inputs is None else net_inputs[i], decide=decide[i])
+
+    for game in starting:
+        game.start_play()
+
+    # Games starting a play on a decision tick decide from their starting positions without moving,
+    # like the Engine does, so the first move of the play acts on a decision made for it
+    deciding = [game for game in starting if game.time % game.decision_interval == 0]
+    if deciding:
+        distance = None
+        for side, half_update in (("offense", False), ("defense", True)):
+            teams = [getattr(game, side) for game in deciding]
+            opponents = [game.defense if side == "offense" else game.offense for game in deciding]
+            own, opposing = gather(teams), gather(opponents)
+            dx, dy = collision.offsets(own[0], own[1], opposing[0], opposing[1])
+            net_inputs, distance = sense_games(deciding[0], side + " starting", own, dx, dy,
+                                               distance if half_update else None)
+            for rows, deciding_team in zip(net_inputs, teams):
+                for i, player in enumerate(deciding_team.players):
+                    player.net_input = rows[i]
+                    player.decide()
+    for game in live:
+        game.time += 1
+        if game.stall_ticks is not None:
+            game.track_progress()
+    drawn = []
+    for game in games:
+        if game.display:
+            drawn.extend(game.draw())
+    return drawn
+
+
+def sense_games(field_state: Gridiron, side: str, own: tuple[np.ndarray, ...], dx: np.ndarray, dy: np.ndarray,
+                distance=None) -> tuple[np.ndarray, np.ndarray | None]:
+    """
+    Fills the network input of one side of many games at once, see sensors.sense() and sensors.sense_nearest()
+
+    :param field_state: any of the games, they all share the field and how players sense
+    :param side: name of the input buffer to fill, see input_buffer()
+    :param own: gather() of the sensing team in each game
+    :param dx: x offsets to every opponent from collision.offsets()
+    :param dy: y offsets to every opponent from collision.offsets()
+    :param distance: scaled distances the opposing side's sensing returned, reused transposed,
+    see Gridiron.net_input() half_update. Defaults to computing them
+    :return: the filled input buffer and the scaled distances to every opponent, None when sensing the nearest
+    """
+    x, y, _, angle, _ = own
+    slots = sensors.slots(x.shape[1], dx.shape[2], field_state.nearest)
+    net_inputs = input_buffer(side, x.shape + (sensors.inputs_size(*slots),))
+    if field_state.nearest is not None:
+        teammate_dx, teammate_dy = collision.offsets(x, y, x, y)
+        teammates = sensors.dense_pairs(teammate_dx, teammate_dy, ~np.eye(x.shape[1], dtype=bool))
+        sensors.sense_nearest(x, y, angle, sensors.dense_pairs(dx, dy), teammates, slots, field_state.bounds,
+                              field_state.score_endzone, field_state.max_dist, field_state.radius, net_inputs)
+        return net_inputs, None
+    return net_inputs, sensors.sense(x, y, angle, dx, dy, field_state.bounds, field_state.score_endzone,
+                                     field_state.max_dist, net_inputs,
+                                     distance=None if distance is None else distance.transpose(0, 2, 1))
+
+
+def input_buffer(side: str, shape: tuple) -> np.ndarray:
+    """
+    Gets the network input buffer of a side, only allocating a new one when its shape changes
+
+    :param side: name of the buffer, such as "offense" or "defense starting"
+    :param shape: (games, players, inputs)
+    :return: buffer to fill with sensors.sense()
+    """
+    buffer = input_buffers.get(side)
+    if buffer is None or buffer.shape != shape:
+        buffer = input_buffers[side] = np.empty(shape, DTYPE)
+    return buffer
+
+
+def gather(teams: list[Team]) -> tuple[np.ndarray, ...]:
+    """
+    Gathers the state of the players of many teams into arrays
+
+    :param teams: teams with the same roster
+    :return: x, y, rect width and angle shaped (teams, players) and strength shaped (players,)
+    """
+    players = [p for group in teams for p in group.players]
+    shape = (len(teams), -1)
+    x = np.array([p.rect.centerx for p in players], dtype=float).reshape(shape)
+    y = np.array([p.rect.centery for p in players], dtype=float).reshape(shape)
+    size = np.array([p.rect.width for p in players], dtype=float).reshape(shape)
+    angle = np.array([p.angle for p in players], dtype=float).reshape(shape)
+    strength = np.array([p.strength for p in teams[0].players], dtype=float)
+    return x, y, size, angle, strength
+
+
+def resolve_contacts(own: tuple[np.ndarray, ...], opposing: tuple[np.ndarray, ...]) -> tuple[np.ndarray, ...]:
+    """
+    Finds which players collide with opponents and the forces pushing them for many games at once,
+    replacing pygame.sprite.groupcollide() and Rect.clipline() per pair of players
+
+    :param own: gather() of the team being updated in each game
+    :param opposing: gather() of the team opposing it in each game
+    :return: collided (games, players, opponents), the x and y external force (games, players)
+    and the x and y offsets to every opponent (games, players, opponents)
+    """
+    x, y, size, _, strength = own
+    ox, oy, osize, oangle, ostrength = opposing
+    dx, dy = collision.offsets(x, y, ox, oy)
+    collided = collision.collide(dx, dy, size, osize)
+    force_x, force_y = collision.push(collided, dx, dy, size, strength, ostrength, oangle)
+    return collided, force_x, force_y, dx, dy
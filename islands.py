@@ -0,0 +1,115 @@
+import multiprocessing
+import numpy as np
+from evolution import POPULATION, Evolution
+
+TOPOLOGIES = ("ring", "random")
+INTERVAL = 10
+MIGRANTS = 5
+
+
+class Islands:
+    """
+    Island model evolution. Every island is an independent evolution.Evolution in its own process, so
+    selection stays local and the islands only wait on each other to migrate. Every interval generations
+    each island sends copies of its best offenses and defenses to the next island of a ring, or of a ring
+    shuffled every migration for the random topology, where they replace the newest children.
+    """
+    def __init__(self, islands: int, population=POPULATION, seed=None, interval=INTERVAL, migrants=MIGRANTS,
+                 topology="ring", **options):
+        """
+        :param islands: number of islands, each run by its own process
+        :param population: number of winners kept each generation on each island
+        :param seed: seed for the seed of every island and the random topology
+        :param interval: generations played between migrations
+        :param migrants: teams of each side sent by every island each migration
+        :param topology: where migrants go, a value of TOPOLOGIES
+        :param options: keyword arguments of every island's evolution.Evolution, such as racing or players
+        """
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"unknown topology {topology}, choose from {TOPOLOGIES}")
+        if not 0 <= migrants <= population:
+            raise ValueError(f"migrants must be between 0 and the population of {population}")
+        self.rng = np.random.RandomState(seed)
+        self.interval = interval
+        self.migrants = migrants
+        self.topology = topology
+        self.generation = 0
+        self.points = None
+        self.plays = None
+        self.game_ticks = 0
+        self.immigrants = [None] * islands
+
+        context = multiprocessing.get_context("spawn")
+        self.connections = []
+        self.processes = []
+        for island_seed in self.rng.randint(2 ** 31, size=islands):
+            connection, child = context.Pipe()
+            process = context.Process(target=island, args=(child, population, int(island_seed), migrants, options),
+                                      daemon=True)
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def run(self, generations: int):
+        """
+        Runs the given number of generations on every island
+
+        :param generations: number of generations to run
+        """
+        end = self.generation + generations
+        while self.generation < end:
+            self.step(min(self.interval, end - self.generation))
+
+    def step(self, generations=None):
+        """
+        Plays generations on every island at once, then migrates
+
+        :param generations: number of generations to play before migrating, defaults to interval
+        """
+        generations = self.interval if generations is None else generations
+        for connection, immigrants in zip(self.connections, self.immigrants):
+            connection.send((generations, immigrants))
+        results = [connection.recv() for connection in self.connections]
+        self.generation += generations
+        self.points = np.concatenate([points for points, _, _, _ in results])
+        self.plays = np.concatenate([plays for _, plays, _, _ in results])
+        self.game_ticks = sum(game_ticks for _, _, game_ticks, _ in results)
+
+        order = self.rng.permutation(len(results)) if self.topology == "random" else np.arange(len(results))
+        for source, destination in zip(order, np.roll(order, -1)):
+            self.immigrants[destination] = results[source][3] if self.migrants else None
+
+    def close(self):
+        """
+        Stops every island
+        """
+        for connection in self.connections:
+            connection.send(None)
+        for process in self.processes:
+            process.join()
+        for connection in self.connections:
+            connection.close()
+
+
+def island(connection, population: int, seed: int, migrants: int, options: dict):
+    """
+    Island process loop. Receives (generations, immigrants) until None, takes in the immigrants, plays the
+    generations and sends back the stats of the last one with its emigrants.
+
+    :param connection: pipe to the Islands
+    :param population: number of winners kept each generation
+    :param seed: seed for the island's evolution.Evolution
+    :param migrants: teams of each side to send back
+    :param options: keyword arguments of evolution.Evolution
+    """
+    run = Evolution(population, seed=seed, **options)
+    try:
+        while (message := connection.recv()) is not None:
+            generations, immigrants = message
+            if immigrants is not None:
+                run.immigrate(*immigrants)
+            run.run(generations)
+            connection.send((run.points, run.plays, run.game_ticks, run.emigrants(migrants)))
+    finally:
+        run.close()
+        connection.close()
@@ -1,124 +1,345 @@
-import pygame
+import argparse
 import field
 import team
-import gridiron
-from copy import deepcopy
+import neural_net
+import evolution
+import checkpoint
+from metrics import Instruments
+from reproduction import CROSSOVERS, SELECTIONS, Reproduction
+from islands import INTERVAL, MIGRANTS, TOPOLOGIES, Islands
+from physics import DECISION_INTERVAL
+from recorder import TOP, Recorder
+from scenarios import ScenarioTable
+from time import perf_counter
+import numpy as np
 import random
 
+POPULATION = evolution.POPULATION
+TICKS = evolution.TICKS
+OPPONENTS = evolution.OPPONENTS
+# Options of evolution.run_evolution() main() doesn't take, see parse_args()
+HEADLESS_OPTIONS = ("generations", "workers", "seed", "racing", "opponents", "fitness_cache")
 
-def main():
+
+def main(population=POPULATION, checkpoint_dir=None, deltas=False, resume=None, dirty=False, viewer=False, metrics=None,
+         players=team.PLAYERS, nearest=None, hidden=None, selection="top", crossover=None, record=None,
+         record_top=TOP, decision_interval=DECISION_INTERVAL, play_budget=None, stall_ticks=None, scenarios=None):
     """
     Handle the operations of running the simulation
+
+    :param population: number of winners kept each generation, twice as many teams play
+    :param checkpoint_dir: directory to write a checkpoint into every generation, None disables checkpoints
+    :param deltas: whether checkpoints between full checkpoints only hold the networks that changed
+    :param resume: checkpoint file or directory to continue a run from
+    :param dirty: whether to only redraw and update the parts of the screen around the displayed game's
+    players and line of scrimmage instead of the whole screen every frame
+    :param viewer: whether to run the simulation uncapped behind a hidden window and render the displayed game
+    in a separate viewer process, see viewer.Viewer
+    :param metrics: JSON lines file to append phase timings and stats of every generation to, see metrics.Instruments
+    :param players: players per side, a key of team.FORMATIONS
+    :param nearest: number of nearest opponents and teammates each player senses, None senses every opponent
+    :param hidden: offense and defense hidden layer sizes, defaults to team.OFFENSE_HIDDEN and team.DEFENSE_HIDDEN
+    :param selection: how parents are picked, a value of reproduction.SELECTIONS
+    :param crossover: how parents are mixed, a value of reproduction.CROSSOVERS, None copies one parent
+    :param record: directory to record the displayed game and the top games of every generation into,
+    see replay.py. None records nothing
+    :param record_top: number of top scoring games recorded besides the displayed game
+    :param decision_interval: ticks between network decisions, the last decision is repeated in between
+    :param play_budget: plays after which a game is finished, a generation ends early once every game is finished
+    :param stall_ticks: ticks after which a game that neither scored nor carried the ball further than before
+    is finished, None never finishes stalled games
+    :param scenarios: number of scenarios in a scenarios.ScenarioTable every game picks its starting positions
+    from, None places players at random every play
     """
+    # Only the display loads pygame, so headless runs and the processes they spawn never import it
+    import pygame
+    import gridiron
+    from viewer import Viewer
+
     pygame.init()
-    screen = pygame.display.set_mode((1200, 700))
+    screen = pygame.display.set_mode(evolution.SCREEN_SIZE, pygame.HIDDEN if viewer else 0)
     pygame.display.set_caption("FootballAI")
     clock = pygame.time.Clock()
 
-    # Background
-    background = pygame.Surface(screen.get_size())
-    background = background.convert()
-    background.fill((24, 150, 0))
-    screen.blit(background, (0, 0))
-
     # Get Bounds
     screen_size = screen.get_size()
     field_bounds = (screen_size[0] / 4, screen_size[0] * 3 / 4)
 
-    # Prep first gen teams
-    active_offense = []
-    active_defense = []
+    # Field, drawn once, see field.get_field_surface()
+    view = Viewer(screen_size, field_bounds, players) if viewer else None
+    if view is None:
+        screen.blit(field.get_field_surface(screen_size, field_bounds), (0, 0))
+        pygame.display.flip()
+    drawn = []
+
+    # Prep first gen teams, every team's networks are views into one population store per side
+    offense_positions, defense_positions = team.formation(players)
+    offense_size, defense_size = team.team_sizes(players)
+    offense_sizes, defense_sizes = team.network_sizes(players, nearest, hidden)
+    saved = checkpoint.load(resume) if resume is not None else None
+    table = ScenarioTable(players, scenarios, seed=np.random.randint(2 ** 31)) if scenarios else None
+    if saved is not None:
+        offense_networks = neural_net.Population(len(saved.offense[0]), offense_sizes,
+                                                 neural_net.pack(saved.offense))
+        defense_networks = neural_net.Population(len(saved.defense[0]), defense_sizes,
+                                                 neural_net.pack(saved.defense))
+    else:
+        offense_networks = neural_net.Population(2 * population * offense_size, offense_sizes)
+        defense_networks = neural_net.Population(2 * population * defense_size, defense_sizes)
+    offenses = [team.Offense(offense_networks.networks[i:i + offense_size], offense_positions)
+                for i in range(0, offense_networks.size, offense_size)]
+    defenses = [team.Defense(defense_networks.networks[i:i + defense_size], defense_positions)
+                for i in range(0, defense_networks.size, defense_size)]
 
-    for i in range(350):
-        active_offense.append(team.Offense())
-        active_defense.append(team.Defense())
+    # Teams are kept for the whole run, reproduction rewrites the genomes their networks view
+    offense_reproduction = Reproduction(offense_networks, offense_size, selection, crossover)
+    defense_reproduction = Reproduction(defense_networks, defense_size, selection, crossover)
+    offense_fitness = np.zeros(len(offenses))
+    defense_fitness = np.zeros(len(defenses))
+    offense_index = defense_index = None
 
     active_games = []
+    recording = Recorder(record, players, screen_size, field_bounds, field.yard_to_pixel(70, screen_size[1]),
+                         record_top) if record is not None else None
 
     # States
     time = 0
     gen = 0
     purge = True
 
-    running = True
-    while running:
-        clock.tick(60)
+    # Instrumentation, nothing is timed without it
+    instruments = Instruments(metrics) if metrics is not None else None
+    if instruments is not None:
+        instruments.instrument_gridiron()
+    generation_start = perf_counter()
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
+    # Checkpoints
+    checkpointer = checkpoint.Checkpointer(checkpoint_dir, deltas) if checkpoint_dir is not None else None
+    if saved is not None:
+        gen = saved.generation
+        if saved.rng_state is not None:
+            np.random.set_state(saved.rng_state)
+        if saved.random_state is not None:
+            random.setstate(saved.random_state)
 
-        # Draw field
-        screen.blit(background, (0, 0))
-        field.draw_field(field_bounds[0], field_bounds[1], screen)
+    try:
+        running = True
+        while running:
+            if view is None:
+                clock.tick(60)
 
-        # Fill Games
-        if purge:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
 
-            active_games.clear()
+            # Draw field, in dirty mode only over what was drawn last frame
+            field_surface = field.get_field_surface(screen.get_size(), field_bounds)
+            erased = drawn
+            if dirty and view is None:
+                for rect in erased:
+                    screen.blit(field_surface, rect, rect)
+            elif view is None:
+                screen.blit(field_surface, (0, 0))
+            drawn = []
 
-            # Create copies of new winners now in active
-            for i in range(len(active_offense)):
-                new_offense, new_defense = copy(active_offense[i], active_defense[i])
-                active_offense.append(new_offense)
-                active_defense.append(new_defense)
+            # Fill Games
+            if purge:
 
-            random.shuffle(active_offense)
-            random.shuffle(active_defense)
+                active_games.clear()
 
-            for o, d in zip(active_offense, active_defense):
-                active_games.append(gridiron.Gridiron(o, d, field_bounds, screen))
+                # Pair every offense with a random defense
+                offense_index = np.random.permutation(len(offenses))
+                defense_index = np.random.permutation(len(defenses))
+                scenario_index = np.random.randint(table.count, size=len(offenses)) if table is not None else \
+                    np.zeros(len(offenses), dtype=int)
+                for o, d, s in zip(offense_index, defense_index, scenario_index):
+                    active_games.append(gridiron.Gridiron(offenses[o], defenses[d], field_bounds, screen, nearest,
+                                                          decision_interval, play_budget, stall_ticks, table, s))
 
-            active_games[0].display = True
+                active_games[0].display = view is None
+                if recording is not None:
+                    recording.start(len(active_games), TICKS + 1, offense_size + defense_size)
 
-            # Reset time and purge
-            purge = False
-            gen += 1
-            print(f"Generation #{gen}")
-            time = 0
-        else:
-            # Have all active games and
-            time += 1
-            for i in range(len(active_games)):
-                active_games[i].update()
+                # Reset time and purge
+                purge = False
+                gen += 1
+                print(f"Generation #{gen}")
+                time = 0
+                generation_start = perf_counter()
+            else:
+                # Have all active games and
+                time += 1
+                drawn = gridiron.update_games(active_games)
+                if recording is not None:
+                    recording.record_games(time - 1, active_games)
+                if view is not None:
+                    view.update(active_games[0], gen)
 
-            if time > 600:
-                active_offense.clear()
-                active_defense.clear()
-                active_games.sort(key=lambda x: x.points, reverse=True)
-                for winner_idx in range(int(len(active_games) / 2)):
-                    active_offense.append(active_games[winner_idx].offense)
-                for winner_idx in range(int(len(active_games) / 2), len(active_games)):
-                    active_defense.append(active_games[winner_idx].defense)
+                if time > TICKS or all(game.finished for game in active_games):
+                    # Offenses that scored the most and defenses that allowed the least breed the next generation
+                    selection_start = perf_counter()
+                    points = np.array([g.points for g in active_games])
+                    offense_fitness[offense_index] = points
+                    defense_fitness[defense_index] = -points
+                    offense_winners = offense_reproduction.reproduce(offense_fitness, np.random.randint(2 ** 31))
+                    defense_winners = defense_reproduction.reproduce(defense_fitness, np.random.randint(2 ** 31))
+                    if instruments is not None:
+                        instruments.timer.add("selection", perf_counter() - selection_start)
+                        instruments.generation(gen, points, np.array([g.plays - g.in_play for g in active_games]),
+                                               sum(g.time for g in active_games), perf_counter() - generation_start)
+                    if recording is not None:
+                        recording.finish(gen, points, offense_index, defense_index)
 
-                purge = True
+                    if checkpointer is not None:
+                        checkpointer.save(checkpoint.Checkpoint(
+                            gen, offense_networks.weights, defense_networks.weights, points=points,
+                            offense_index=offense_index, defense_index=defense_index,
+                            offense_winners=offense_winners, defense_winners=defense_winners,
+                            rng_state=np.random.get_state(), random_state=random.getstate()))
 
-        # print(clock.get_fps())
+                    purge = True
 
-        pygame.display.flip()
+            # print(clock.get_fps())
+
+            if dirty and view is None:
+                pygame.display.update(erased + drawn)
+            elif view is None:
+                pygame.display.flip()
+    finally:
+        if view is not None:
+            view.close()
+        if instruments is not None:
+            instruments.close()
     pygame.quit()
 
 
-def copy(old_offense: team.Offense, old_defense: team.Defense) -> tuple[team.Offense, team.Defense]:
+def headless(config: dict):
     """
-    copies the given offense and defense. Creates a deep copy of their networks and runs neural_net.mutate()
+    Runs the evolution without a display on the batched engine, see evolution.run_evolution()
 
-    :param old_offense: offense to be copied
-    :param old_defense: defense to be copied
-    :return: the new offense and defense created
+    :param config: options of evolution.run_evolution(), see parse_args()
     """
-    new_offense = team.Offense()
-    new_defense = team.Defense()
+    evolution.run_evolution(config, report=lambda run: print(f"Generation #{run.generation}"))
 
-    for o, n in zip(old_offense.players, new_offense.players):
-        n.network.weights = deepcopy(o.network.weights)
-    for o, n in zip(old_defense.players, new_defense.players):
-        n.network.weights = deepcopy(o.network.weights)
 
-    new_offense.mutate()
-    new_defense.mutate()
-    return new_offense, new_defense
+def island_model(config: dict, islands: int, migration_interval=INTERVAL, migrants=MIGRANTS, topology="ring"):
+    """
+    Runs the evolution without a display on several islands, each in its own process, see islands.Islands
+
+    :param config: options of evolution.run_evolution(), see parse_args(). generations, population, seed and
+    metrics apply to the whole run, the metrics only holding the stats of the last generation before every
+    migration as phases run in the island processes. The rest are the options of every island's
+    evolution.Evolution, islands don't checkpoint or record
+    :param islands: number of islands
+    :param migration_interval: generations played between migrations
+    :param migrants: teams of each side every island sends each migration
+    :param topology: where migrants go, a value of islands.TOPOLOGIES
+    """
+    config = dict(config)
+    generations = config.pop("generations", None)
+    population = config.pop("population", POPULATION)
+    seed = config.pop("seed", None)
+    metrics = config.pop("metrics", None)
+    for key in ("checkpoint_dir", "deltas", "resume", "record", "record_top"):
+        config.pop(key, None)
+    run = Islands(islands, population, seed, migration_interval, migrants, topology, **config)
+    instruments = Instruments(metrics) if metrics is not None else None
+    try:
+        while generations is None or run.generation < generations:
+            start = perf_counter()
+            run.step(migration_interval if generations is None else
+                     min(migration_interval, generations - run.generation))
+            print(f"Generation #{run.generation}")
+            if instruments is not None:
+                instruments.generation(run.generation, run.points, run.plays, run.game_ticks, perf_counter() - start)
+    finally:
+        run.close()
+        if instruments is not None:
+            instruments.close()
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parses the command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Evolve football playing neural networks")
+    parser.add_argument("--headless", action="store_true", help="run without a display on the batched engine")
+    parser.add_argument("--generations", type=int, default=None, help="generations to run in headless mode")
+    parser.add_argument("--population", type=int, default=POPULATION, help="winners kept each generation")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes evaluating games in headless mode")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the headless run")
+    parser.add_argument("--checkpoint-dir", default=None, help="directory to write a checkpoint into every generation")
+    parser.add_argument("--deltas", action="store_true", help="write checkpoints as deltas between full checkpoints")
+    parser.add_argument("--resume", default=None, help="checkpoint file or directory to continue a run from")
+    parser.add_argument("--racing", nargs="+", type=int, default=None,
+                        help="ticks of each successive halving round in headless mode, e.g. 100 200 300")
+    parser.add_argument("--dirty", action="store_true",
+                        help="only redraw the parts of the screen that change instead of the whole screen")
+    parser.add_argument("--viewer", action="store_true",
+                        help="run the simulation uncapped and render it in a separate viewer process")
+    parser.add_argument("--metrics", default=None,
+                        help="JSON lines file to append phase timings and stats of every generation to")
+    parser.add_argument("--players", type=int, choices=sorted(team.FORMATIONS), default=team.PLAYERS,
+                        help="players per side")
+    parser.add_argument("--nearest", type=int, default=None,
+                        help="sense only the nearest K opponents and teammates instead of every opponent")
+    parser.add_argument("--offense-hidden", nargs="+", type=int, default=team.OFFENSE_HIDDEN,
+                        help="hidden layer sizes of the offense networks, e.g. 16 8")
+    parser.add_argument("--defense-hidden", nargs="+", type=int, default=team.DEFENSE_HIDDEN,
+                        help="hidden layer sizes of the defense networks, e.g. 16 8")
+    parser.add_argument("--selection", choices=SELECTIONS, default="top",
+                        help="pick parents from the survivors best first or by tournaments")
+    parser.add_argument("--crossover", choices=CROSSOVERS, default=None,
+                        help="mix two parents into every child instead of copying one")
+    parser.add_argument("--islands", type=int, default=0,
+                        help="evolve this many separate populations in their own processes in headless mode")
+    parser.add_argument("--migration-interval", type=int, default=INTERVAL, help="generations between migrations")
+    parser.add_argument("--migrants", type=int, default=MIGRANTS,
+                        help="teams of each side every island sends each migration")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="ring", help="islands the migrants are sent to")
+    parser.add_argument("--record", default=None,
+                        help="directory to record the displayed game and the top games of every generation into")
+    parser.add_argument("--record-top", type=int, default=TOP, help="top scoring games recorded each generation")
+    parser.add_argument("--opponents", type=int, default=OPPONENTS,
+                        help="opponents each team plays every generation in headless mode, played as extra games "
+                             "of the batch")
+    parser.add_argument("--decision-interval", type=int, default=DECISION_INTERVAL,
+                        help="ticks between network decisions, players repeat their last decision in between")
+    parser.add_argument("--play-budget", type=int, default=None, help="plays after which a game is finished")
+    parser.add_argument("--stall-ticks", type=int, default=None,
+                        help="ticks after which a game that neither scored nor carried the ball further is finished")
+    parser.add_argument("--scenarios", type=int, default=None,
+                        help="number of seeded play scenarios every game picks its starting positions from")
+    parser.add_argument("--fitness-cache", action="store_true",
+                        help="reuse the outcome of games between teams that survived unchanged, needs --scenarios")
+    args = parser.parse_args()
+    if args.decision_interval < 1:
+        parser.error("--decision-interval must be at least 1")
+    if args.record and args.workers:
+        parser.error("--record can't be combined with --workers, only games played in this process are recorded")
+    headless_only = [flag for flag, used in (("--generations", args.generations is not None),
+                                              ("--seed", args.seed is not None), ("--workers", args.workers),
+                                              ("--racing", args.racing), ("--islands", args.islands)) if used]
+    if headless_only and not args.headless:
+        parser.error(f"{', '.join(headless_only)} can't be used without --headless")
+    if args.opponents != OPPONENTS and not args.headless:
+        parser.error("--opponents needs --headless, only the batched engine plays several opponents per team")
+    if args.fitness_cache and (not args.headless or not args.scenarios or args.racing or args.record):
+        parser.error("--fitness-cache needs --headless and --scenarios and can't be combined with --racing or --record")
+    if args.islands and (args.checkpoint_dir or args.resume or args.workers or args.record):
+        parser.error("--islands can't be combined with --checkpoint-dir, --resume, --workers or --record")
+    return args
 
 
 if __name__ == "__main__":
-    main()
+    config = vars(parse_args())
+    config["hidden"] = (config.pop("offense_hidden"), config.pop("defense_hidden"))
+    display = {key: config.pop(key) for key in ("headless", "dirty", "viewer")}
+    island_options = {key: config.pop(key) for key in ("islands", "migration_interval", "migrants", "topology")}
+    if display["headless"] and island_options["islands"]:
+        island_model(config, **island_options)
+    elif display["headless"]:
+        headless(config)
+    else:
+        main(dirty=display["dirty"], viewer=display["viewer"],
+             **{key: value for key, value in config.items() if key not in HEADLESS_OPTIONS})
@@ -0,0 +1,211 @@
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+
+
+class PhaseTimer:
+    """
+    Times phases of the simulation by wrapping the functions that run them.
+    Times are inclusive, a phase that calls another also counts the time spent in it.
+    """
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._wrapped = []
+
+    def wrap(self, owner, name: str, phase: str):
+        """
+        Replaces owner.name with a version that adds its run time to the given phase
+
+        :param owner: module or class holding the function
+        :param name: name of the function
+        :param phase: phase the time counts towards
+        """
+        original = getattr(owner, name)
+        totals, calls = self.totals, self.calls
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                totals[phase] += time.perf_counter() - start
+                calls[phase] += 1
+
+        setattr(owner, name, timed)
+        self._wrapped.append((owner, name, original))
+
+    def add(self, phase: str, seconds: float):
+        """
+        Adds time measured by the caller to a phase
+
+        :param phase: phase the time counts towards
+        :param seconds: time spent
+        """
+        self.totals[phase] += seconds
+        self.calls[phase] += 1
+
+    def restore(self):
+        """
+        Puts back every wrapped function
+        """
+        for owner, name, original in reversed(self._wrapped):
+            setattr(owner, name, original)
+        self._wrapped.clear()
+
+
+class MetricsWriter:
+    """
+    Appends records to a JSON lines file from a background thread, so writing never blocks the caller
+    """
+    def __init__(self, path: str):
+        """
+        :param path: file to append to
+        """
+        self.file = open(path, "a")
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, record: dict):
+        """
+        Queues a record to be written
+
+        :param record: JSON serializable dict
+        """
+        self.queue.put(record)
+
+    def _run(self):
+        """
+        Writer thread loop, writes queued records until close() queues None
+        """
+        while (record := self.queue.get()) is not None:
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+
+    def close(self):
+        """
+        Writes every queued record and closes the file
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+
+
+class Instruments:
+    """
+    Per phase timers and per generation stats streamed to a JSON lines file. Timers are installed by
+    wrapping the functions of each phase, so a run that never creates Instruments runs them unmodified.
+    Phases are only timed in this process, worker processes are timed as a whole by the evaluate phase.
+    """
+    def __init__(self, path: str):
+        """
+        :param path: JSON lines file to append a record to every generation
+        """
+        self.timer = PhaseTimer()
+        self.writer = MetricsWriter(path)
+
+    def instrument_engine(self):
+        """
+        Times the phases of evolution.Evolution on the batched Engine, see instrument_engine()
+        """
+        instrument_engine(self.timer)
+
+    def instrument_gridiron(self):
+        """
+        Times the phases of the Gridiron loop in main.main(), see instrument_gridiron()
+        """
+        instrument_gridiron(self.timer)
+
+    def generation(self, generation: int, points: np.ndarray, plays: np.ndarray, game_ticks: int, wall: float):
+        """
+        Queues the record of a generation and starts timing the next one
+
+        :param generation: generation number
+        :param points: points scored in each game
+        :param plays: plays completed in each game
+        :param game_ticks: ticks simulated summed over every game
+        :param wall: wall time of the generation in seconds
+        """
+        record = {"generation": generation, "wall": wall}
+        record.update(generation_stats(points, plays, game_ticks))
+        record["phases"] = dict(self.timer.totals)
+        record["calls"] = dict(self.timer.calls)
+        self.timer.totals.clear()
+        self.timer.calls.clear()
+        self.writer.write(record)
+
+    def close(self):
+        """
+        Removes the timers and finishes writing
+        """
+        self.timer.restore()
+        self.writer.close()
+
+
+def instrument_engine(timer: PhaseTimer):
+    """
+    Times the phases of evolution.Evolution on the batched Engine, also used by benchmark.py
+
+    :param timer: timer to wrap the functions of each phase with
+    """
+    import collision
+    import engine
+    import evolution
+    import sensors
+    import spatial
+
+    timer.wrap(sensors, "sense", "net_input")
+    timer.wrap(sensors, "sense_nearest", "net_input")
+    timer.wrap(spatial, "neighbours", "neighbours")
+    timer.wrap(collision, "collide_pairs", "collisions")
+    timer.wrap(collision, "pair_forces", "collisions")
+    timer.wrap(engine, "feedforward", "feedforward")
+    timer.wrap(engine.Engine, "update_side", "update_team")
+    timer.wrap(evolution.Evolution, "evaluate", "evaluate")
+    timer.wrap(evolution.Evolution, "select", "selection")
+
+
+def instrument_gridiron(timer: PhaseTimer):
+    """
+    Times the phases of the Gridiron loop in main.main(), also used by benchmark.py. Selection is not
+    wrapped, the loop adds it itself.
+
+    :param timer: timer to wrap the functions of each phase with
+    """
+    import gridiron
+    import neural_net
+    import player
+    import sensors
+
+    timer.wrap(sensors, "sense", "net_input")
+    timer.wrap(sensors, "sense_nearest", "net_input")
+    timer.wrap(gridiron, "resolve_contacts", "collisions")
+    timer.wrap(neural_net.Network, "feedforward", "feedforward")
+    timer.wrap(gridiron.Gridiron, "update_team", "update_team")
+    timer.wrap(player.Player, "update", "player_update")
+
+
+def generation_stats(points: np.ndarray, plays: np.ndarray, game_ticks: int) -> dict:
+    """
+    Summarizes the games of a generation. Every play ends in a touchdown or a tackle.
+
+    :param points: points scored in each game
+    :param plays: plays completed in each game
+    :param game_ticks: ticks simulated summed over every game
+    :return: JSON serializable stats
+    """
+    points = np.asarray(points, dtype=float)
+    touchdowns = int(points.sum() // 7)
+    completed = int(np.sum(plays))
+    quantiles = np.quantile(points, [0, 0.25, 0.5, 0.75, 1]) if len(points) else [0] * 5
+    return {"games": len(points), "game_ticks": int(game_ticks),
+            "points": {"mean": float(points.mean()) if len(points) else 0.0,
+                       "std": float(points.std()) if len(points) else 0.0,
+                       "min": float(quantiles[0]), "p25": float(quantiles[1]), "median": float(quantiles[2]),
+                       "p75": float(quantiles[3]), "max": float(quantiles[4])},
+            "touchdowns": touchdowns, "tackles": completed - touchdowns, "plays": completed,
+            "ticks_per_play": game_ticks / completed if completed else None}
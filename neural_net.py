@@ -1,15 +1,20 @@
 import numpy as np
-import random
+
+# Weights are stored and fed forward in single precision
+DTYPE = np.float32
+# Rows of random numbers drawn at once when filling or breeding a Population, bounding the temporary memory
+CHUNK_ROWS = 4096
 
 
 class Network:
     """
     Simple neural network
     """
-    def __init__(self, layer_sizes):
+    def __init__(self, layer_sizes, weights=None):
         self.sizes = layer_sizes
-        self.weights = [np.random.randn(y, x)
-                        for x, y in zip(layer_sizes[:-1], layer_sizes[1:])]
+        if weights is None:
+            weights = views(np.random.randn(genome_size(layer_sizes)).astype(DTYPE), layer_sizes)
+        self.weights = weights
 
     def feedforward(self, a):
         """
@@ -17,18 +22,139 @@ class Network:
         :param a: network input
         :return: values of the output nodes
         """
-        for w in self.weights:
-            a = sigmoid(np.dot(w, a))
-        return a
+        return feedforward(self.weights, a)
+
+
+class Population:
+    """
+    Store of the networks of many players sharing the same layer sizes.
+    Every network's weights are one row of a contiguous (N, genome_size()) DTYPE genome matrix, and
+    weights holds a (N, out, in) view of each layer's columns. networks[i] is a Network whose weights
+    are views into row i, so the whole population can be fed forward or bred at once, see reproduction.Reproduction.
+    A second genome, the back buffer, can hold the next generation until swap() makes it the front one.
+    """
+    def __init__(self, size, layer_sizes, genome=None, rng=np.random, back=None):
+        """
+        :param size: number of networks
+        :param layer_sizes: number of nodes in each layer
+        :param genome: existing (size, genome_size()) DTYPE genome to view, defaults to new random weights
+        :param rng: source of random numbers with the np.random API, such as a np.random.RandomState
+        :param back: existing genome to use as the back buffer, defaults to allocating one when first needed
+        """
+        self.size = size
+        self.sizes = layer_sizes
+        self.rng = rng
+        fill = genome is None
+        if fill:
+            genome = np.empty((size, genome_size(layer_sizes)), dtype=DTYPE)
+        elif genome.shape != (size, genome_size(layer_sizes)):
+            raise ValueError(f"genome shaped {genome.shape} does not hold {size} networks of layers {layer_sizes}")
+        self.genome = genome
+        self.weights = views(genome, layer_sizes)
+        if fill:
+            for w in self.weights:
+                for start in range(0, size, CHUNK_ROWS):
+                    stop = min(start + CHUNK_ROWS, size)
+                    w[start:stop] = rng.randn(stop - start, *w.shape[1:])
+        self.back = back
+        self._networks = None
+
+    @property
+    def networks(self) -> list[Network]:
+        """
+        Network of each row, only built when first used so the batched engine never creates them
+        """
+        if self._networks is None:
+            self._networks = [Network(self.sizes, [w[i] for w in self.weights]) for i in range(self.size)]
+        return self._networks
 
-    def mutate(self):
+    def back_buffer(self) -> np.ndarray:
         """
-        Gives all weights in the network a random chance to change by -3 to 3
+        Gets the genome the next generation is written into, see swap()
+
+        :return: back buffer shaped like genome
+        """
+        if self.back is None:
+            self.back = np.empty_like(self.genome)
+        return self.back
+
+    def swap(self):
         """
-        for i in range(len(self.weights[0])):
-            for k in range(len(self.weights[0][i])):
-                if random.randint(0, 1) == 0:
-                    self.weights[0][i][k] += random.uniform(-3, 3)
+        Makes the back buffer the front genome. Networks already built are pointed at their new rows,
+        so teams holding them play with the next generation's weights.
+        """
+        self.genome, self.back = self.back_buffer(), self.genome
+        self.weights = views(self.genome, self.sizes)
+        if self._networks is not None:
+            for i, network in enumerate(self._networks):
+                network.weights[:] = [w[i] for w in self.weights]
+
+    def feedforward(self, a):
+        """
+        Get the output of every network in the population
+        :param a: network input of every network, shaped (N, in)
+        :return: values of the output nodes, shaped (N, out)
+        """
+        return feedforward(self.weights, a)
+
+    def grouped(self, group_size):
+        """
+        Views the weights with rows grouped into teams
+
+        :param group_size: number of consecutive rows in a group
+        :return: per layer weights shaped (N / group_size, group_size, out, in)
+        """
+        return [w.reshape(-1, group_size, *w.shape[1:]) for w in self.weights]
+
+
+def genome_size(layer_sizes) -> int:
+    """
+    Gets the number of weights in a network
+
+    :param layer_sizes: number of nodes in each layer
+    :return: number of weights
+    """
+    return sum(x * y for x, y in zip(layer_sizes[:-1], layer_sizes[1:]))
+
+
+def views(genome, layer_sizes) -> list[np.ndarray]:
+    """
+    Views the columns of a genome as per layer weights, laid out one layer after another
+
+    :param genome: weights of one network shaped (genome_size(),) or of many shaped (..., genome_size())
+    :param layer_sizes: number of nodes in each layer
+    :return: per layer weights shaped (..., out, in)
+    """
+    weights = []
+    offset = 0
+    for x, y in zip(layer_sizes[:-1], layer_sizes[1:]):
+        weights.append(genome[..., offset:offset + x * y].reshape(genome.shape[:-1] + (y, x)))
+        offset += x * y
+    return weights
+
+
+def pack(weights) -> np.ndarray:
+    """
+    Copies per layer weights, such as those of a checkpoint, into one genome matrix
+
+    :param weights: per layer weights shaped (N, out, in)
+    :return: DTYPE genome shaped (N, genome_size())
+    """
+    return np.concatenate([np.reshape(w, (len(w), -1)) for w in weights], axis=1).astype(DTYPE)
+
+
+def feedforward(weights, a):
+    """
+    Feeds input through layers of weights, batched over any leading dimensions
+
+    :param weights: per layer weights shaped (..., out, in)
+    :param a: network input shaped (..., in), fed forward in the precision of the weights
+    :return: values of the output nodes shaped (..., out)
+    """
+    a = np.asarray(a, dtype=weights[0].dtype)
+    for w in weights:
+        a = sigmoid(np.matmul(w, a[..., None])[..., 0])
+    return a
 
 
 def sigmoid(z):
@@ -0,0 +1,202 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import team
+from engine import Engine
+from neural_net import DTYPE, Population, genome_size
+from physics import DECISION_INTERVAL
+from racing import Halving
+
+# Populations attached by each worker process, see attach()
+worker_state = {}
+
+
+def share(population: Population) -> tuple[Population, shared_memory.SharedMemory]:
+    """
+    Moves a population's genome and its back buffer into a block of shared memory so worker processes
+    can attach to them without pickling
+
+    :param population: population to share
+    :return: the population viewing the shared memory and the shared memory block itself
+    """
+    block = shared_memory.SharedMemory(create=True, size=2 * population.genome.nbytes)
+    genome, back = view(block, population.size, population.sizes)
+    genome[...] = population.genome
+    return Population(population.size, population.sizes, genome, population.rng, back), block
+
+
+def view(block: shared_memory.SharedMemory, size: int, layer_sizes: list[int]) -> np.ndarray:
+    """
+    Views a block of shared memory as the two genome buffers of a population, see Population.swap()
+
+    :param block: shared memory holding the genomes
+    :param size: number of networks
+    :param layer_sizes: number of nodes in each layer
+    :return: genomes shaped (2, size, genome_size())
+    """
+    return np.ndarray((2, size, genome_size(layer_sizes)), dtype=DTYPE, buffer=block.buf)
+
+
+def attach(offense_spec: tuple, defense_spec: tuple, bounds: tuple[float, float], height: float,
+           players=team.PLAYERS, nearest=None, decision_interval=DECISION_INTERVAL, play_budget=None,
+           stall_ticks=None, scenarios=None):
+    """
+    Worker initializer attaching to the shared offense and defense populations
+
+    :param offense_spec: (shared memory name, size, layer sizes) of the offense population
+    :param defense_spec: (shared memory name, size, layer sizes) of the defense population
+    :param bounds: x coordinate bounds for the field
+    :param height: height of the field/window in pixels
+    :param players: players per side, a key of team.FORMATIONS
+    :param nearest: number of nearest players sensed, None senses every opponent
+    :param decision_interval: ticks between network decisions, see Engine
+    :param play_budget: plays after which a game is finished, see Engine
+    :param stall_ticks: ticks after which a stalled game is finished, see Engine
+    :param scenarios: scenarios.ScenarioTable plays start from, see Engine
+    """
+    for side, (name, size, layer_sizes) in (("offense", offense_spec), ("defense", defense_spec)):
+        block = shared_memory.SharedMemory(name=name)
+        worker_state[side + "_block"] = block
+        worker_state[side] = [Population(size, layer_sizes, genome) for genome in view(block, size, layer_sizes)]
+    worker_state["bounds"] = bounds
+    worker_state["height"] = height
+    worker_state["players"] = players
+    worker_state["nearest"] = nearest
+    worker_state["decision_interval"] = decision_interval
+    worker_state["play_budget"] = play_budget
+    worker_state["stall_ticks"] = stall_ticks
+    worker_state["scenarios"] = scenarios
+
+
+def play(offense_index: np.ndarray, defense_index: np.ndarray, game_ids: np.ndarray, seed: int,
+         fronts=(0, 0)) -> Engine:
+    """
+    Sets up one shard of games headless in a worker
+
+    :param offense_index: offense team playing each game
+    :param defense_index: defense team playing each game
+    :param game_ids: id of each game in the whole generation, or its scenario when playing scenarios
+    :param seed: seed for the random starting positions
+    :param fronts: which of the two shared genomes of the offense and defense is the front one
+    :return: engine holding the shard's games
+    """
+    return Engine(worker_state["offense"][fronts[0]], worker_state["defense"][fronts[1]], worker_state["bounds"],
+                  worker_state["height"], offense_index, defense_index, seed=seed, game_ids=game_ids,
+                  players=worker_state["players"], nearest=worker_state["nearest"],
+                  decision_interval=worker_state["decision_interval"], play_budget=worker_state["play_budget"],
+                  stall_ticks=worker_state["stall_ticks"], scenarios=worker_state["scenarios"])
+
+
+def worker(connection, *spec):
+    """
+    Worker process loop. Attaches to the shared populations, then receives messages until None.
+    ("play", offense_index, defense_index, game_ids, seed, fronts) sets up a new shard of games, see play().
+    ("run", keep, ticks) first drops every game of the shard not in the keep mask, unless it is None, then plays
+    ticks and sends back the points, plays and advance of every game of the shard and the game ticks simulated.
+    The engine is kept between rounds, so the ParallelEvaluator makes every racing cut over all the games.
+
+    :param connection: pipe to the ParallelEvaluator
+    :param spec: arguments of attach()
+    """
+    attach(*spec)
+    engine = None
+    try:
+        while (message := connection.recv()) is not None:
+            if message[0] == "play":
+                engine = play(*message[1:])
+                continue
+            _, keep, ticks = message
+            if keep is not None:
+                engine.keep(keep[engine.index])
+            engine.run(ticks)
+            connection.send((*engine.results(), engine.game_ticks))
+    finally:
+        connection.close()
+
+
+class ParallelEvaluator:
+    """
+    Plays a generation's games on a pool of worker processes. The genomes live in shared memory,
+    so each generation only the pairings are sent to the workers and only the outcomes come back.
+    Every worker keeps its shard's engine between the rounds of racing, so the cuts are made over all
+    the games at once and the results don't depend on the number of workers, see racing.Halving.
+    """
+    def __init__(self, offense: Population, defense: Population, bounds: tuple[float, float], height: float,
+                 workers: int, players=team.PLAYERS, nearest=None, decision_interval=DECISION_INTERVAL,
+                 play_budget=None, stall_ticks=None, scenarios=None):
+        """
+        :param offense: offense population, its genome is moved into shared memory
+        :param defense: defense population, its genome is moved into shared memory
+        :param bounds: x coordinate bounds for the field
+        :param height: height of the field/window in pixels
+        :param workers: number of worker processes
+        :param players: players per side, a key of team.FORMATIONS
+        :param nearest: number of nearest players sensed, None senses every opponent
+        :param decision_interval: ticks between network decisions, see Engine
+        :param play_budget: plays after which a game is finished, see Engine
+        :param stall_ticks: ticks after which a stalled game is finished, see Engine
+        :param scenarios: scenarios.ScenarioTable plays start from, sent to every worker once, see Engine
+        """
+        self.offense, self._offense_block = share(offense)
+        self.defense, self._defense_block = share(defense)
+        self._offense_genomes = (self.offense.genome, self.offense.back)
+        self._defense_genomes = (self.defense.genome, self.defense.back)
+        self.workers = workers
+        spec = ((self._offense_block.name, offense.size, offense.sizes),
+                (self._defense_block.name, defense.size, defense.sizes), bounds, height, players, nearest,
+                decision_interval, play_budget, stall_ticks, scenarios)
+        context = multiprocessing.get_context("spawn")
+        self.connections = []
+        self.processes = []
+        for _ in range(workers):
+            connection, child = context.Pipe()
+            process = context.Process(target=worker, args=(child, *spec), daemon=True)
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def evaluate(self, offense_index: np.ndarray, defense_index: np.ndarray, seed: int,
+                 rounds: list[int], scenario_index=None) -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        Plays every game split into one shard per worker. When racing, the cuts are made over every shard.
+
+        :param offense_index: offense team playing each game
+        :param defense_index: defense team playing each game
+        :param seed: seed for the random starting positions
+        :param rounds: ticks played in each round of racing.race()
+        :param scenario_index: scenario of each game when playing scenarios
+        :return: points scored and plays completed in each game, and the number of game ticks simulated
+        """
+        game_ids = np.arange(len(offense_index)) if scenario_index is None else scenario_index
+        shards = [s for s in np.array_split(np.arange(len(offense_index)), self.workers) if len(s)]
+        fronts = (int(self.offense.genome is self._offense_genomes[1]),
+                  int(self.defense.genome is self._defense_genomes[1]))
+        connections = self.connections[:len(shards)]
+        for connection, s in zip(connections, shards):
+            connection.send(("play", offense_index[s], defense_index[s], game_ids[s], seed, fronts))
+
+        halving = Halving(len(offense_index), rounds, len(offense_index) // 2)
+        racing = None
+        game_ticks = 0
+        for i, ticks in enumerate(rounds):
+            for connection, s in zip(connections, shards):
+                connection.send(("run", None if racing is None else racing[s], ticks))
+            results = [connection.recv() for connection in connections]
+            points, plays, advance = (np.concatenate([result[k] for result in results]) for k in range(3))
+            game_ticks = sum(shard_ticks for *_, shard_ticks in results)
+            racing = halving.update(i, points, plays, advance)
+        return halving.points, halving.plays, game_ticks
+
+    def close(self):
+        """
+        Stops the workers and releases the shared memory. The blocks stay mapped in this process
+        while the populations viewing them are still referenced.
+        """
+        for connection in self.connections:
+            connection.send(None)
+        for process in self.processes:
+            process.join()
+        for connection in self.connections:
+            connection.close()
+        for block in (self._offense_block, self._defense_block):
+            block.unlink()
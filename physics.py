@@ -0,0 +1,34 @@
+import math
+
+# Side length of a player's sprite before scaling and the scale players are drawn and collide at
+SIZE = 100
+SCALE = 0.35
+
+# Ticks between network decisions, the last decision is repeated in between, see Player.update()
+DECISION_INTERVAL = 1
+
+
+def get_rotated_size(angle: float) -> float:
+    """
+    returns the width and height of a player's rect after their sprite is rotated to the given angle,
+    without doing any image work
+
+    :param angle: angle the player faces
+    :return: side length of the rotated bounding box
+    """
+    radian = math.radians(angle)
+    return SIZE * SCALE * (abs(math.cos(radian)) + abs(math.sin(radian)))
+
+
+def get_movement_vector(length: float, angle: float) -> tuple[float, float]:
+    """
+    returns the vector components with given information
+
+    :param length: magnitude of the vector
+    :param angle: angle of the vector
+    :return: vector components
+    """
+    radian = math.radians(angle)
+    x = math.cos(radian) * length
+    y = math.sin(radian) * -length
+    return x, y
@@ -1,12 +1,18 @@
 import pygame
-from os import getcwd
-import math
+import os
 from neural_net import Network
+from physics import DECISION_INTERVAL, SIZE, SCALE, get_movement_vector, get_rotated_size
 
-data_dir = getcwd() + "\\Images\\"
+# Images next to this module, so the game runs from any working directory
+data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Images", "")
 
-SIZE = 100
-SCALE = 0.35
+# Sprites shared between every player of the same color and role, see get_sprite()
+sprite_cache = {}
+
+# Pre-rotated sprites used when drawing, see get_rotated_sprite()
+ANGLE_STEP = 5
+BALL_COLOR = (222, 184, 135)
+atlas_cache = {}
 
 
 def load_image(name, scale=SCALE):
@@ -18,7 +24,9 @@ def load_image(name, scale=SCALE):
     :return: the image and a matching pygame.rect object
     """
     sprite = pygame.image.load(data_dir + name)
-    sprite = sprite.convert_alpha()
+    # Converting needs a display, headless games keep the sprite as loaded since they never draw it
+    if pygame.display.get_surface() is not None:
+        sprite = sprite.convert_alpha()
     size = sprite.get_size()
     scale = (size[0] * scale, size[1] * scale)
 
@@ -28,18 +36,46 @@ def load_image(name, scale=SCALE):
     return sprite, rect
 
 
-def get_movement_vector(length: float, angle: float) -> tuple[float, float]:
+def get_sprite(color: str, role: str) -> pygame.Surface:
+    """
+    gets the sprite for a color and role, loading it only the first time it is requested in this process
+
+    :param color: team color of the sprite
+    :param role: role of the player
+    :return: the loaded and scaled image
     """
-    returns the vector components with given information
+    key = (color, role)
+    if key not in sprite_cache:
+        sprite_cache[key] = load_image(color + "_" + role + ".png")[0]
+    return sprite_cache[key]
 
-    :param length: magnitude of the vector
-    :param angle: angle of the vector
-    :return: vector components
+
+def get_rotated_sprite(color: str, role: str, angle: float, has_ball: bool) -> pygame.Surface:
+    """
+    gets the sprite for a color and role rotated to the nearest ANGLE_STEP of the given angle.
+    Each color and role gets an atlas of every rotation, with and without the ball drawn on,
+    built the first time it is drawn.
+
+    :param color: team color of the sprite
+    :param role: role of the player
+    :param angle: angle the player faces
+    :param has_ball: whether to draw the ball on the sprite
+    :return: the rotated image
     """
-    radian = math.radians(angle)
-    x = math.cos(radian) * length
-    y = math.sin(radian) * -length
-    return x, y
+    key = (color, role)
+    if key not in atlas_cache:
+        sprite = get_sprite(color, role)
+        rotations = [pygame.transform.rotate(sprite, step * ANGLE_STEP - 90) for step in range(360 // ANGLE_STEP)]
+        carrying = []
+        for image in rotations:
+            image = image.copy()
+            width, height = image.get_size()
+            image.fill(BALL_COLOR, (width / 4, height / 2, 10, 10))
+            carrying.append(image)
+        atlas_cache[key] = (rotations, carrying)
+
+    step = round(angle / ANGLE_STEP) % (360 // ANGLE_STEP)
+    return atlas_cache[key][has_ball][step]
 
 
 class Player(pygame.sprite.Sprite):
@@ -47,10 +83,11 @@ class Player(pygame.sprite.Sprite):
     Object representing a player. A player can be on offense or defense on red or blue team.
     Each player is tracked on their team by the player_id attribute.
     """
-    def __init__(self, role: str, color: str, stats: list[int], player_id: int):
+    def __init__(self, role: str, color: str, stats: list[int], player_id: int, network: Network):
         pygame.sprite.Sprite.__init__(self)
         # Team
         self.role = role
+        self.color = color
         self.player_id = player_id
 
         # stats
@@ -58,18 +95,26 @@ class Player(pygame.sprite.Sprite):
         self.strength = stats[1]
 
         # Pygame
-        self.sprite, self.rect = load_image(color + "_" + role + ".png")
-        self.image = pygame.Surface((SIZE * SCALE, SIZE * SCALE))
+        self.sprite = get_sprite(color, role)
+        self.rect = self.sprite.get_rect()
+        self.image = self.sprite
 
         # State
         self.angle = 90
         self.has_ball = False
 
         # Network
-        self.network = Network([10, 2])
-        self.net_input = [0]*10
+        self.network = network
+        self.net_input = [0] * self.network.sizes[0]
+        self.action = None
+
+    def decide(self):
+        """
+        Runs the network on the player's current input, its output is acted on until the next decision
+        """
+        self.action = self.network.feedforward(self.net_input)
 
-    def update(self, bounds: tuple[int, int], max_height: int, external_force=(0, 0)):
+    def update(self, bounds: tuple[int, int], max_height: int, external_force=(0, 0), render=False, decide=True):
         """
         Updates the player. Moves them according to the output of Network.feedfoward() and
         any external forces another player has applied to them.
@@ -77,8 +122,12 @@ class Player(pygame.sprite.Sprite):
         :param bounds: x coordinate bounds limiting players to the field
         :param max_height: y coordinate bound limiting players to the field
         :param external_force: any external forces being applied to the player, defaults (0, 0)
+        :param render: whether the player will be drawn, players that aren't drawn skip all image work
+        :param decide: whether to run the network, otherwise the last output is repeated
         """
-        move, turn = self.network.feedforward(self.net_input)
+        if decide:
+            self.decide()
+        move, turn = self.action
 
         if turn < 0.25:
             self.angle = (self.angle + 2*self.speed) % 360
@@ -95,27 +144,10 @@ class Player(pygame.sprite.Sprite):
             if max_height > y > 0:
                 self.rect.centery = y
 
-        self.image = pygame.transform.rotate(self.sprite, self.angle - 90)
-        self.rect = self.image.get_rect(center=self.rect.center)
-
-        if self.has_ball:
-            surface = pygame.Surface((10, 10))
-            surface.fill((222, 184, 135))
-            self.image.blit(surface, (self.rect.width / 4, self.rect.height / 2))
+        center = self.rect.center
+        self.rect.size = (get_rotated_size(self.angle),) * 2
+        self.rect.center = center
 
-    def get_face_corners(self) -> tuple[tuple[float, float], tuple[float, float]]:
-        """
-        Gets the two coordinates of the corners of a players face.
-
-        :return: two sets coordinates
-        """
-        size = self.sprite.get_size()
-        corner_distance = math.sqrt(size[0] ** 2 + size[1] ** 2) / 2
-        radian = math.radians(self.angle + 45)
-        x1 = math.cos(radian) * corner_distance + self.rect.centerx
-        y1 = math.sin(radian) * -corner_distance + self.rect.centery
-        radian = math.radians((self.angle - 45))
-        x2 = math.cos(radian) * corner_distance + self.rect.centerx
-        y2 = math.sin(radian) * -corner_distance + self.rect.centery
-        return (x1, y1), (x2, y2)
+        if render:
+            self.image = get_rotated_sprite(self.color, self.role, self.angle, self.has_ball)
 
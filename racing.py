@@ -0,0 +1,72 @@
+import math
+import numpy as np
+from engine import Engine
+
+
+class Halving:
+    """
+    Cuts of successive halving over games that may be spread over several engines, see race().
+    Every game plays the first round, then the games that are clearly behind the quota-th best game are
+    dropped and only the survivors play the next round. Games are compared on points, with ties broken by
+    how far the offense has carried the ball (Engine.advance), and are only dropped when strictly behind
+    the cut so ties at the cut keep playing. The number of survivors shrinks geometrically so that quota
+    games are left for the last round. Games an engine retired on its own keep their outcome and still
+    count towards the cut.
+    """
+    def __init__(self, games: int, rounds: list[int], quota: int):
+        """
+        :param games: number of games raced
+        :param rounds: ticks played in each round, one round plays every game for the whole budget
+        :param quota: number of games the selection needs ranked exactly, such as half the games
+        """
+        self.games = games
+        self.rounds = rounds
+        self.quota = quota
+        self.points = np.zeros(games)
+        self.plays = np.zeros(games, dtype=np.int64)
+        self.racing = np.ones(games, dtype=bool)
+        self.shrink = (max(quota, 1) / games) ** (1 / max(len(rounds) - 1, 1)) if games else 1
+
+    def update(self, round_index: int, points: np.ndarray, plays: np.ndarray, advance: np.ndarray):
+        """
+        Takes the outcome of every game after a round and drops the games clearly behind the cut
+
+        :param round_index: index of the round just played
+        :param points: points scored so far in each game, see Engine.results()
+        :param plays: plays completed so far in each game
+        :param advance: advance so far of each game
+        :return: boolean mask of the games that play the next round, or None when no cut was made
+        """
+        self.points[self.racing] = points[self.racing]
+        self.plays[self.racing] = plays[self.racing]
+        if round_index == len(self.rounds) - 1:
+            return None
+
+        target = max(self.quota, math.ceil(self.games * self.shrink ** (round_index + 1)))
+        remaining = np.count_nonzero(self.racing)
+        if remaining <= target:
+            return None
+        score = self.points + np.minimum(advance, 1) / 2
+        cut = np.partition(score[self.racing], remaining - target)[remaining - target]
+        self.racing &= score >= cut
+        return self.racing
+
+
+def race(engine: Engine, rounds: list[int], quota: int) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Successive halving evaluation of the games of one engine, see Halving
+
+    :param engine: engine holding the games, compacted as games are dropped
+    :param rounds: ticks played in each round, one round plays every game for the whole budget
+    :param quota: number of games the selection needs ranked exactly, such as half the games
+    :return: points scored and plays completed in each of the engine's original games,
+    and the number of game ticks simulated
+    """
+    halving = Halving(engine.games, rounds, quota)
+    start_ticks = engine.game_ticks
+    for i, ticks in enumerate(rounds):
+        engine.run(ticks)
+        racing = halving.update(i, *engine.results())
+        if racing is not None:
+            engine.keep(racing[engine.index])
+    return halving.points, halving.plays, engine.game_ticks - start_ticks
@@ -0,0 +1,167 @@
+import os
+import re
+import numpy as np
+import checkpoint
+
+TOP = 5
+# Positions are stored in 1/16 pixels and angles in 1/65536 turns, both as uint16
+POSITION_SCALE = 16
+ANGLE_SCALE = 65536 / 360
+FILE_PATTERN = re.compile(r"gen_(\d+)\.rec$")
+
+
+class Recorder:
+    """
+    Records the players of every game each tick as quantized integers, then keeps the displayed game and
+    the top scoring games of each generation in a file per generation. Files use the checkpoint format,
+    so replay.py memory-maps them and only reads the frames it draws.
+    """
+    def __init__(self, directory: str, players: int, size: tuple[int, int], bounds: tuple[float, float],
+                 scrimmage: float, top=TOP):
+        """
+        :param directory: directory to write a file into every generation
+        :param players: players per side, a key of team.FORMATIONS
+        :param size: size of the screen the games are played on
+        :param bounds: x coordinate bounds for the field
+        :param scrimmage: y coordinate of the line of scrimmage
+        :param top: number of top scoring games kept besides the displayed game
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.meta = {"players": players, "size": list(size), "bounds": list(bounds), "scrimmage": scrimmage,
+                     "position_scale": POSITION_SCALE, "angle_scale": ANGLE_SCALE}
+        self.top = top
+        self.x = self.y = self.angle = self.carrier = self.points = None
+        self.ticks = None
+
+    def start(self, games: int, ticks: int, players: int):
+        """
+        Clears the recording for a new generation, reusing the buffers when they are big enough
+
+        :param games: number of games played
+        :param ticks: most ticks a game is played for
+        :param players: players in each game, both sides
+        """
+        if self.x is None or self.x.shape[0] < ticks or self.x.shape[1] != games or self.x.shape[2] != players:
+            self.x = np.zeros((ticks, games, players), dtype=np.uint16)
+            self.y = np.zeros_like(self.x)
+            self.angle = np.zeros_like(self.x)
+            self.carrier = np.zeros((ticks, games), dtype=np.int8)
+            self.points = np.zeros((ticks, games), dtype=np.uint16)
+            self.ticks = np.zeros(games, dtype=np.int64)
+        self.ticks[:] = 0
+
+    def record(self, tick: int, x: np.ndarray, y: np.ndarray, angle: np.ndarray, has_ball: np.ndarray,
+               points: np.ndarray, games=slice(None)):
+        """
+        Records one tick of many games
+
+        :param tick: tick of the games
+        :param x: x coordinates shaped (games, players), offense first
+        :param y: y coordinates shaped (games, players)
+        :param angle: angles shaped (games, players)
+        :param has_ball: whether each player has the ball, shaped (games, players)
+        :param points: points scored in each game
+        :param games: games of the recording the rows belong to, defaults to all of them
+        """
+        if tick >= len(self.x):
+            return
+        self.x[tick, games] = np.clip(np.rint(x * POSITION_SCALE), 0, 65535)
+        self.y[tick, games] = np.clip(np.rint(y * POSITION_SCALE), 0, 65535)
+        self.angle[tick, games] = np.rint(np.mod(angle, 360) * ANGLE_SCALE) % 65536
+        self.carrier[tick, games] = np.where(has_ball.any(axis=1), has_ball.argmax(axis=1), -1)
+        self.points[tick, games] = points
+        self.ticks[games] = tick + 1
+
+    def record_engine(self, engine):
+        """
+        Records the current tick of an engine.Engine, whose games are rows of the recording in the order paired
+
+        :param engine: engine being stepped
+        """
+        self.record(engine.time, engine.x, engine.y, engine.angle, engine.has_ball, engine.points, engine.index)
+
+    def record_games(self, tick: int, games: list):
+        """
+        Records the current tick of gridiron.Gridiron games, games that finished before this tick are skipped
+
+        :param tick: tick of the games
+        :param games: games in recording order
+        """
+        rows = np.array([i for i, game in enumerate(games) if game.time > tick], dtype=np.int64)
+        games = [games[i] for i in rows]
+        players = [p for game in games for side in (game.offense, game.defense) for p in side.players]
+        shape = (len(games), -1)
+        self.record(tick, np.array([p.rect.centerx for p in players], dtype=float).reshape(shape),
+                    np.array([p.rect.centery for p in players], dtype=float).reshape(shape),
+                    np.array([p.angle for p in players], dtype=float).reshape(shape),
+                    np.array([p.has_ball for p in players]).reshape(shape), [game.points for game in games], rows)
+
+    def finish(self, generation: int, points: np.ndarray, offense_index=None, defense_index=None,
+               displayed=0) -> str:
+        """
+        Writes the displayed game and the top scoring games of the generation
+
+        :param generation: generation the games were played in
+        :param points: final points of each game
+        :param offense_index: offense team that played each game
+        :param defense_index: defense team that played each game
+        :param displayed: game shown live, kept whatever it scored
+        :return: path of the file written
+        """
+        order = np.argsort(-np.asarray(points), kind="stable")
+        games = [displayed] + [int(g) for g in order[:self.top + 1] if g != displayed][:self.top]
+        ticks = int(self.ticks[games].max())
+        arrays = {"games": np.array(games), "ticks": self.ticks[games], "final_points": np.asarray(points)[games],
+                  "x": self.x[:ticks, games].transpose(1, 0, 2), "y": self.y[:ticks, games].transpose(1, 0, 2),
+                  "angle": self.angle[:ticks, games].transpose(1, 0, 2), "carrier": self.carrier[:ticks, games].T,
+                  "points": self.points[:ticks, games].T}
+        # Frames after a game stopped, such as a game dropped by racing.race(), still hold older games
+        for i, stop in enumerate(arrays["ticks"]):
+            for name in ("x", "y", "angle", "carrier", "points"):
+                arrays[name][i, stop:] = 0
+        for name, index in (("offense_index", offense_index), ("defense_index", defense_index)):
+            if index is not None:
+                arrays[name] = np.asarray(index)[games]
+        path = os.path.join(self.directory, f"gen_{generation:08d}.rec")
+        checkpoint.write(path, arrays, dict(self.meta, generation=generation))
+        return path
+
+
+def recordings(directory: str) -> list[tuple[int, str]]:
+    """
+    Lists the recordings in a directory
+
+    :param directory: directory to search
+    :return: (generation, path) of each recording, oldest first
+    """
+    files = []
+    for name in os.listdir(directory):
+        match = FILE_PATTERN.match(name)
+        if match:
+            files.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(files)
+
+
+def load(path: str) -> tuple[dict, dict]:
+    """
+    Loads a recording, memory-mapped so only the frames used are read
+
+    :param path: file written by Recorder.finish()
+    :return: the recording's meta values and a dict of name to array. x, y and angle are quantized and
+    shaped (games, ticks, players), see dequantize()
+    """
+    return checkpoint.read(path)
+
+
+def dequantize(meta: dict, x: np.ndarray, y: np.ndarray, angle: np.ndarray) -> tuple[np.ndarray, ...]:
+    """
+    Turns recorded positions and angles back into pixels and degrees
+
+    :param meta: meta values of the recording
+    :param x: recorded x coordinates
+    :param y: recorded y coordinates
+    :param angle: recorded angles
+    :return: x, y and angle
+    """
+    return x / meta["position_scale"], y / meta["position_scale"], angle / meta["angle_scale"]
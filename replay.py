@@ -0,0 +1,65 @@
+import argparse
+import os
+import numpy as np
+import pygame
+import recorder
+import viewer
+
+FPS = 60
+
+
+def replay(path: str, games=None, fps=FPS):
+    """
+    Plays back the games of a recording one after another through the viewer's drawing code,
+    without any networks or simulation
+
+    :param path: file written by recorder.Recorder, or a directory to play its newest recording
+    :param games: positions of the games in the recording to play, defaults to all of them,
+    the displayed game first and then the top scoring games
+    :param fps: frame rate to play at
+    """
+    if os.path.isdir(path):
+        files = recorder.recordings(path)
+        if not files:
+            raise FileNotFoundError(f"no recordings in {path}")
+        path = files[-1][1]
+    meta, arrays = recorder.load(path)
+    size = tuple(meta["size"])
+    bounds = tuple(meta["bounds"])
+    roles = viewer.sprites(meta["players"])
+
+    pygame.init()
+    screen = pygame.display.set_mode(size)
+    clock = pygame.time.Clock()
+    for game in range(len(arrays["games"])) if games is None else games:
+        pygame.display.set_caption(f"FootballAI - Generation #{meta['generation']} - "
+                                   f"game {int(arrays['games'][game])} - {int(arrays['final_points'][game])} points")
+        for tick in range(int(arrays["ticks"][game])):
+            clock.tick(fps)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    return
+            x, y, angle = recorder.dequantize(meta, arrays["x"][game, tick], arrays["y"][game, tick],
+                                              arrays["angle"][game, tick])
+            has_ball = np.arange(len(roles)) == arrays["carrier"][game, tick]
+            viewer.draw(screen, size, bounds, meta["scrimmage"], roles, x, y, angle, has_ball)
+            pygame.display.flip()
+    pygame.quit()
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parses the command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Replay recorded games")
+    parser.add_argument("path", help="recording file, or a directory to play its newest recording")
+    parser.add_argument("--games", nargs="+", type=int, default=None,
+                        help="positions of the games in the recording to play, 0 is the displayed game")
+    parser.add_argument("--fps", type=int, default=FPS, help="frame rate to play at")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    replay(args.path, args.games, args.fps)
@@ -0,0 +1,149 @@
+import numpy as np
+from neural_net import CHUNK_ROWS, DTYPE, Population
+
+SELECTIONS = ("top", "tournament")
+CROSSOVERS = ("uniform", "blend")
+TOURNAMENT = 3
+MUTATION_RATE = 0.5
+MUTATION_SCALE = 3
+
+
+class Reproduction:
+    """
+    Breeds the next generation of a Population's teams straight from its genome matrix. The best half of
+    the teams by fitness survive in their own rows and the rows of the rest are filled with children of
+    parents picked by truncation (top) or tournament selection, optionally crossed over and then mutated,
+    every weight having a rate chance of changing by -scale to scale. Only the rows of the children change,
+    so delta checkpoints stay small, see checkpoint.Checkpointer. The next generation is written into the
+    back buffer and the buffers are then swapped, see Population.swap().
+    Every genome sized array is preallocated for CHUNK_ROWS teams, so a generation allocates nothing
+    that grows with the genome.
+    """
+    def __init__(self, population: Population, team_size: int, selection="top", crossover=None,
+                 tournament=TOURNAMENT, rate=MUTATION_RATE, scale=MUTATION_SCALE):
+        """
+        :param population: population holding whole teams of team_size consecutive rows
+        :param team_size: number of players on a team
+        :param selection: how parents are picked, a value of SELECTIONS. top cycles through the survivors
+        from best to worst, tournament takes the fittest of tournament random teams
+        :param crossover: how two parents are mixed, a value of CROSSOVERS. uniform takes every weight from
+        either parent, blend takes a random point between them. None copies a single parent
+        :param tournament: number of teams in each tournament
+        :param rate: chance of each weight of a child changing
+        :param scale: weights change by -scale to scale
+        """
+        if selection not in SELECTIONS:
+            raise ValueError(f"unknown selection {selection}, choose from {SELECTIONS}")
+        if crossover is not None and crossover not in CROSSOVERS:
+            raise ValueError(f"unknown crossover {crossover}, choose from {CROSSOVERS}")
+        self.population = population
+        self.team_size = team_size
+        self.teams = population.size // team_size
+        self.keep = self.teams // 2
+        self.selection = selection
+        self.crossover = crossover
+        self.rate = rate
+        self.scale = scale
+        population.back_buffer()
+
+        children = self.teams - self.keep
+        chunk = min(children, CHUNK_ROWS)
+        width = team_size * population.genome.shape[1]
+        self.noise = np.empty((chunk, width), dtype=DTYPE)
+        self.mask = np.empty((chunk, width), dtype=bool)
+        self.other = np.empty((chunk, width), dtype=DTYPE) if crossover is not None else None
+        self.children = np.empty((chunk, width), dtype=DTYPE)
+        self.first = np.empty(children, dtype=np.intp)
+        self.second = np.empty(children, dtype=np.intp)
+        self.cycle = np.arange(children) % max(self.keep, 1)
+        self.draws = np.empty((children, tournament))
+        self.contestants = np.empty((children, tournament), dtype=np.intp)
+        self.scores = np.empty((children, tournament))
+        self.best = np.empty(children, dtype=np.intp)
+        self.offsets = np.arange(children) * tournament
+
+    def reproduce(self, fitness: np.ndarray, seed: int) -> np.ndarray:
+        """
+        Writes the next generation into the back buffer and swaps it to the front
+
+        :param fitness: fitness of every team, higher is better
+        :param seed: seed for the generation's random draws
+        :return: teams that survived, best first, their rows are unchanged
+        """
+        generator = np.random.Generator(np.random.PCG64(seed))
+        front = self.population.genome.reshape(self.teams, -1)
+        back = self.population.back_buffer().reshape(self.teams, -1)
+
+        # Indices are always in range, mode="clip" keeps np.take from buffering its output
+        order = np.argsort(-fitness, kind="stable")
+        survivors = order[:self.keep]
+        # Survivors keep their rows, the rows of the other teams are overwritten with the children below
+        rows = child_rows(survivors, self.teams)
+        np.copyto(back, front)
+        self.pick(generator, order, fitness, self.first)
+        if self.crossover is not None:
+            self.pick(generator, order, fitness, self.second)
+
+        for start in range(self.keep, self.teams, len(self.noise)):
+            stop = min(start + len(self.noise), self.teams)
+            children = self.children[:stop - start]
+            noise, mask = self.noise[:stop - start], self.mask[:stop - start]
+            np.take(front, self.first[start - self.keep:stop - self.keep], axis=0, out=children, mode="clip")
+            if self.crossover is not None:
+                other = self.other[:stop - start]
+                np.take(front, self.second[start - self.keep:stop - self.keep], axis=0, out=other, mode="clip")
+                generator.random(dtype=DTYPE, out=noise)
+                if self.crossover == "uniform":
+                    np.less(noise, 0.5, out=mask)
+                    np.copyto(children, other, where=mask)
+                else:
+                    other -= children
+                    other *= noise
+                    children += other
+
+            # Mutation, every weight changes by -scale to scale with a chance of rate
+            generator.random(dtype=DTYPE, out=noise)
+            np.less(noise, self.rate, out=mask)
+            generator.random(dtype=DTYPE, out=noise)
+            noise *= 2 * self.scale
+            noise -= self.scale
+            noise *= mask
+            children += noise
+            back[rows[start - self.keep:stop - self.keep]] = children
+
+        self.population.swap()
+        return survivors
+
+    def pick(self, generator: np.random.Generator, order: np.ndarray, fitness: np.ndarray, out: np.ndarray):
+        """
+        Picks a parent team for every child
+
+        :param generator: source of the generation's random draws
+        :param order: teams sorted from best to worst
+        :param fitness: fitness of every team
+        :param out: buffer to write the parent of each child into
+        """
+        if self.selection == "top":
+            np.take(order, self.cycle, out=out, mode="clip")
+            return
+        generator.random(out=self.draws)
+        self.draws *= self.teams
+        np.copyto(self.contestants, self.draws, casting="unsafe")
+        np.take(fitness, self.contestants, out=self.scores, mode="clip")
+        np.argmax(self.scores, axis=1, out=self.best)
+        self.best += self.offsets
+        np.take(self.contestants, self.best, out=out, mode="clip")
+
+
+def child_rows(survivors: np.ndarray, teams: int) -> np.ndarray:
+    """
+    Gets the rows the children of a generation are written to, the rows of every team that didn't survive
+    in ascending order. Child i of Reproduction.reproduce() takes the ith of them.
+
+    :param survivors: teams that survived
+    :param teams: number of teams
+    :return: rows of the children
+    """
+    children = np.ones(teams, dtype=bool)
+    children[survivors] = False
+    return np.flatnonzero(children)
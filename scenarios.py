@@ -0,0 +1,42 @@
+import numpy as np
+import team
+from engine import OFFENSE_ANGLE, DEFENSE_ANGLE
+
+SCENARIOS = 256
+PLAYS = 64
+
+
+class ScenarioTable:
+    """
+    Precomputed starting positions and orientations of every player for each play of a number of scenarios.
+    A game plays one scenario, its nth play starting from row n of the scenario, so games on the same scenario
+    start every play alike and can be compared, see Engine.set_play() and Gridiron.start_play().
+    """
+    def __init__(self, players=team.PLAYERS, count=SCENARIOS, plays=PLAYS, seed=None, turn=0.0):
+        """
+        :param players: players per side, a key of team.FORMATIONS
+        :param count: number of scenarios
+        :param plays: plays in each scenario, later plays start over from the first
+        :param seed: seed the table is drawn from, the same seed always gives the same table
+        :param turn: players face up to turn degrees either side of their team's starting angle
+        """
+        offense_size, defense_size = team.team_sizes(players)
+        generator = np.random.Generator(np.random.PCG64(seed))
+        self.count = count
+        self.plays = plays
+        # Fraction of the way across the half of the field players start in, see Team.set_team()
+        self.x = generator.random((count, plays, offense_size + defense_size))
+        facing = np.array([OFFENSE_ANGLE] * offense_size + [DEFENSE_ANGLE] * defense_size, dtype=float)
+        self.angle = facing + generator.uniform(-turn, turn, self.x.shape) if turn else \
+            np.broadcast_to(facing, self.x.shape)
+
+    def lookup(self, scenario, play) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the start of a play
+
+        :param scenario: scenario of each game, an int or an array
+        :param play: number of plays already started in each game, broadcast against scenario
+        :return: x fractions and angles of every player, offense first
+        """
+        play = np.asarray(play) % self.plays
+        return self.x[scenario, play], self.angle[scenario, play]
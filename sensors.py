@@ -0,0 +1,169 @@
+import math
+import numpy as np
+
+# Players further than this are not sensed when sensing the nearest players, see sense_nearest()
+SENSE_YARDS = 10
+
+
+def inputs_size(opponents: int, teammates=0) -> int:
+    """
+    Gets the number of network inputs a player has, a distance and angle for every sensed opponent
+    and teammate and for both corners of the end zone
+
+    :param opponents: number of opponents sensed
+    :param teammates: number of teammates sensed
+    :return: number of inputs
+    """
+    return 2 * (opponents + teammates) + 4
+
+
+def slots(team_size: int, opponents: int, nearest=None) -> tuple[int, int]:
+    """
+    Gets the number of opponents and teammates a player senses
+
+    :param team_size: number of players on the player's team
+    :param opponents: number of players on the opposing team
+    :param nearest: number of nearest opponents and teammates to sense, see sense_nearest().
+    None senses every opponent and no teammates, see sense()
+    :return: opponent and teammate slots
+    """
+    if nearest is None:
+        return opponents, 0
+    return min(nearest, opponents), min(nearest, team_size - 1)
+
+
+def sense(x: np.ndarray, y: np.ndarray, angle: np.ndarray, dx: np.ndarray, dy: np.ndarray,
+          bounds: tuple[float, float], endzone: float, max_dist: float, out: np.ndarray, distance=None) -> np.ndarray:
+    """
+    Fills the network input of every player in every game, the batched equivalent of Gridiron.net_input().
+    Slots 2i and 2i + 1 hold the distance and angle to opponent i, the last four slots the distance and
+    angle to the left and right corner of the end zone. Distances are scaled by max_dist and angles
+    by vision_to_obj().
+
+    :param x: x coordinates of the players, shaped (games, players)
+    :param y: y coordinates of the players, shaped (games, players)
+    :param angle: angle the players face, shaped (games, players)
+    :param dx: x offsets to every opponent from collision.offsets(), shaped (games, players, opponents)
+    :param dy: y offsets to every opponent from collision.offsets(), shaped (games, players, opponents)
+    :param bounds: x coordinate bounds for the field
+    :param endzone: y coordinate of the end zone being scored on
+    :param max_dist: distance inputs are scaled by
+    :param out: preallocated input buffer shaped (games, players, inputs_size(opponents)), written in place
+    :param distance: already scaled distances to every opponent, such as the transposed distances returned
+    when sensing for the opposing team. Defaults to computing them, see Gridiron.net_input() half_update
+    :return: the scaled distances to every opponent
+    """
+    if distance is None:
+        distance = np.hypot(dx, dy)
+        distance /= max_dist
+    vision = np.radians(angle)
+    vx, vy = np.cos(vision), -np.sin(vision)
+
+    out[..., 0:-4:2] = distance
+    out[..., 1:-4:2] = vision_to_obj(vx[..., None], vy[..., None], dx, dy)
+    sense_endzone(x, y, vx, vy, bounds, endzone, max_dist, out)
+    return distance
+
+
+def sense_nearest(x: np.ndarray, y: np.ndarray, angle: np.ndarray, opponents: tuple, teammates: tuple,
+                  slots: tuple[int, int], bounds: tuple[float, float], endzone: float, max_dist: float,
+                  radius: float, out: np.ndarray):
+    """
+    Fills a fixed size network input of the nearest opponents and teammates of every player in every game,
+    so the input doesn't grow with the roster. The first slot pairs hold the distance and angle to the
+    nearest opponents, nearest first, then the nearest teammates, then the end zone corners like sense().
+    Only players within radius are sensed, empty slots read as distance 1 and angle 0.
+    Players are given as flat lists of pairs grouped by player, so the work grows with the pairs rather than
+    the players squared. Players the same distance away are ordered by column, so every pair order within a
+    group gives the same input.
+
+    :param x: x coordinates of the players, shaped (games, players)
+    :param y: y coordinates of the players, shaped (games, players)
+    :param angle: angle the players face, shaped (games, players)
+    :param opponents: (player, dx, dy, column) flat arrays of player and opponent pairs, player indexing
+    the flattened (games, players) arrays, with the pairs of each player next to each other such as
+    the pairs of spatial.neighbours()
+    :param teammates: (player, dx, dy, column) of player and teammate pairs
+    :param slots: number of opponents and teammates sensed, see slots()
+    :param bounds: x coordinate bounds for the field
+    :param endzone: y coordinate of the end zone being scored on
+    :param max_dist: distance inputs are scaled by
+    :param radius: furthest distance sensed
+    :param out: preallocated input buffer shaped (games, players, inputs_size(*slots)), written in place
+    """
+    vision = np.radians(angle)
+    vx, vy = np.cos(vision), -np.sin(vision)
+    flat = out.reshape(-1, out.shape[-1])
+    first = 0
+    for (player, dx, dy, column), k in zip((opponents, teammates), slots):
+        flat[:, first:first + 2 * k:2] = 1
+        flat[:, first + 1:first + 2 * k:2] = 0
+        if len(player):
+            distance = np.hypot(dx, dy)
+            distance[distance > radius] = np.inf
+            starts = np.flatnonzero(np.r_[True, player[1:] != player[:-1]])
+            counts = np.diff(np.r_[starts, len(player)])
+            owner = player[starts]
+            # One pass per slot takes the nearest pair left of every player, cheaper than sorting for small k
+            for slot in range(first, first + 2 * k, 2):
+                nearest = np.minimum.reduceat(distance, starts)
+                tied = distance == np.repeat(nearest, counts)
+                choice = np.minimum.reduceat(np.where(tied, column, np.iinfo(column.dtype).max), starts)
+                index = np.flatnonzero(tied & (column == np.repeat(choice, counts)))
+                found = np.isfinite(nearest)
+                seen, index = owner[found], index[found]
+                flat[seen, slot] = distance[index] / max_dist
+                flat[seen, slot + 1] = vision_to_obj(vx.ravel()[seen], vy.ravel()[seen], dx[index], dy[index])
+                distance[index] = np.inf
+        first += 2 * k
+    sense_endzone(x, y, vx, vy, bounds, endzone, max_dist, out)
+
+
+def dense_pairs(dx: np.ndarray, dy: np.ndarray, mask=None) -> tuple[np.ndarray, ...]:
+    """
+    Flattens the offsets from collision.offsets() into the pairs taken by sense_nearest()
+
+    :param dx: x offsets shaped (games, players, others)
+    :param dy: y offsets shaped (games, players, others)
+    :param mask: pairs to keep shaped (players, others), such as all but a player with itself, defaults to all
+    :return: (player, dx, dy, column) of every pair
+    """
+    games, players, others = dx.shape
+    mask = np.ones((players, others), dtype=bool) if mask is None else mask
+    game, i, j = np.nonzero(np.broadcast_to(mask, dx.shape))
+    return game * players + i, dx[game, i, j], dy[game, i, j], j
+
+
+def sense_endzone(x: np.ndarray, y: np.ndarray, vx: np.ndarray, vy: np.ndarray, bounds: tuple[float, float],
+                  endzone: float, max_dist: float, out: np.ndarray):
+    """
+    Fills the last four input slots with the distance and angle to the left and right corner of the end zone
+
+    :param x: x coordinates of the players, shaped (games, players)
+    :param y: y coordinates of the players, shaped (games, players)
+    :param vx: x component of the players' vision
+    :param vy: y component of the players' vision
+    :param bounds: x coordinate bounds for the field
+    :param endzone: y coordinate of the end zone being scored on
+    :param max_dist: distance inputs are scaled by
+    :param out: input buffer, written in place
+    """
+    cy = endzone - y
+    for corner in range(len(bounds)):
+        cx = bounds[corner] - x
+        out[..., -2 * (2 - corner)] = np.hypot(cx, cy) / max_dist
+        out[..., -2 * (2 - corner) + 1] = vision_to_obj(vx, vy, cx, cy)
+
+
+def vision_to_obj(vx, vy, dx, dy):
+    """
+    Angle between a player's vision and the direction to an object scaled to [-1, 1],
+    the array equivalent of the helper in Gridiron.net_input()
+
+    :param vx: x component of the player's vision
+    :param vy: y component of the player's vision
+    :param dx: x offset to the object
+    :param dy: y offset to the object
+    :return: the scaled angle
+    """
+    return np.arctan2(vx * dy - vy * dx, vx * dx + vy * dy) / math.pi
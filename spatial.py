@@ -0,0 +1,57 @@
+import math
+import numpy as np
+
+
+def grid_shape(bounds: tuple[float, float], height: float, cell: float) -> tuple[int, int]:
+    """
+    Gets the number of columns and rows of a uniform grid covering the field
+
+    :param bounds: x coordinate bounds for the field
+    :param height: height of the field/window in pixels
+    :param cell: side length of a cell
+    :return: columns and rows
+    """
+    return max(math.ceil((bounds[1] - bounds[0]) / cell), 1), max(math.ceil(height / cell), 1)
+
+
+def neighbours(x: np.ndarray, y: np.ndarray, players: np.ndarray, bounds: tuple[float, float], height: float,
+               cell: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Uniform grid spatial index over the players of every game. Players are bucketed into square cells
+    by sorting on (game, cell), then each queried player is paired with every other player in its own
+    and the eight surrounding cells, so every player closer than cell on both axes is paired.
+    Work grows with the number of pairs found instead of with the square of the number of players.
+
+    :param x: x coordinates of every player, shaped (games, players)
+    :param y: y coordinates of every player, shaped (games, players)
+    :param players: columns of the players to find the neighbours of
+    :param bounds: x coordinate bounds for the field
+    :param height: height of the field/window in pixels
+    :param cell: side length of a cell
+    :return: flat index into x of the queried player and of its neighbour for every pair
+    """
+    games, columns_per_game = x.shape
+    columns, rows = grid_shape(bounds, height, cell)
+    # One cell of padding around the grid so the neighbours of edge cells are empty instead of wrapping
+    width = columns + 2
+    cells = width * (rows + 2)
+    cx = np.clip(((x - bounds[0]) // cell).astype(np.int64), 0, columns - 1)
+    cy = np.clip((y // cell).astype(np.int64), 0, rows - 1)
+    key = (np.arange(games)[:, None] * cells + (cy + 1) * width + (cx + 1)).ravel()
+
+    order = np.argsort(key, kind="stable")
+    counts = np.bincount(key, minlength=games * cells)
+    starts = np.cumsum(counts) - counts
+
+    queried = (np.arange(games)[:, None] * columns_per_game + players).ravel()
+    around = (np.array([-width, 0, width])[:, None] + np.array([-1, 0, 1])).ravel()
+    query = key[queried][:, None] + around
+    found = counts[query].ravel()
+    first = starts[query].ravel()
+
+    owner = np.repeat(np.repeat(queried, len(around)), found)
+    ends = np.cumsum(found)
+    within = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - found, found)
+    other = order[np.repeat(first, found) + within]
+    keep = owner != other
+    return owner[keep], other[keep]
@@ -1,48 +1,135 @@
-import pygame
 import field
-from player import Player
+import sensors
+from neural_net import Network
 import random
 
-OFFENSE_POSITIONS = {"RB": 1, "WR": 2}
-OFFENSE_STATS = {"RB": [4, 5], "WR": [5, 4]}
-DEFENSE_POSITIONS = {"CB": 2, "S": 1}
-DEFENSE_STATS = {"CB": [5, 4], "S": [4, 5]}
+# Offense and defense positions of each supported number of players per side, see formation()
+FORMATIONS = {
+    3: ({"RB": 1, "WR": 2},
+        {"CB": 2, "S": 1}),
+    5: ({"QB": 1, "RB": 1, "WR": 2, "C": 1},
+        {"DT": 1, "MLB": 1, "CB": 2, "S": 1}),
+    7: ({"QB": 1, "RB": 1, "WR": 2, "TE": 1, "G": 1, "C": 1},
+        {"DE": 1, "DT": 1, "MLB": 1, "CB": 2, "S": 2}),
+    11: ({"QB": 1, "RB": 1, "WR": 3, "TE": 1, "T": 2, "G": 2, "C": 1},
+         {"DE": 2, "DT": 2, "OLB": 2, "MLB": 1, "CB": 2, "S": 2}),
+}
+PLAYERS = 3
+OFFENSE_POSITIONS, DEFENSE_POSITIONS = FORMATIONS[PLAYERS]
+OFFENSE_STATS = {"RB": [4, 5], "WR": [5, 4], "QB": [4, 3], "TE": [4, 5], "T": [3, 6], "G": [3, 6], "C": [3, 6]}
+DEFENSE_STATS = {"CB": [5, 4], "S": [4, 5], "DE": [4, 6], "DT": [3, 7], "OLB": [4, 5], "MLB": [4, 6]}
+BALL_CARRIER = "RB"
+# Hidden layer sizes of every offense and defense network, see network_sizes()
+OFFENSE_HIDDEN = []
+DEFENSE_HIDDEN = []
+
+
+def roster(positions: dict, stats: dict) -> list[tuple[str, list[int]]]:
+    """
+    Expands a positions dict into the ordered list of players on a team.
+    A player's index in the list is their player_id.
+
+    :param positions: dict of role to number of players in that role
+    :param stats: dict of role to [speed, strength]
+    :return: list of (role, stats) pairs
+    """
+    return [(role, stats[role]) for role, num_of in positions.items() for _ in range(num_of)]
+
+
+def formation(players: int) -> tuple[dict, dict]:
+    """
+    Gets the offense and defense positions for the given number of players per side
+
+    :param players: players per side, a key of FORMATIONS
+    :return: offense positions and defense positions
+    """
+    if players not in FORMATIONS:
+        raise ValueError(f"no formation for {players} players, choose from {sorted(FORMATIONS)}")
+    offense_positions, defense_positions = FORMATIONS[players]
+    if sum(offense_positions.values()) != players or sum(defense_positions.values()) != players:
+        raise ValueError(f"the {players} player formation has {sum(offense_positions.values())} offense and "
+                         f"{sum(defense_positions.values())} defense players")
+    return offense_positions, defense_positions
+
+
+def team_sizes(players: int) -> tuple[int, int]:
+    """
+    Gets the number of players on the offense and defense of a formation
+
+    :param players: players per side, a key of FORMATIONS
+    :return: offense size and defense size
+    """
+    offense_positions, defense_positions = formation(players)
+    return len(roster(offense_positions, OFFENSE_STATS)), len(roster(defense_positions, DEFENSE_STATS))
+
+
+def network_sizes(players: int, nearest=None, hidden=None) -> tuple[list[int], list[int]]:
+    """
+    Gets the layer sizes of the offense and defense networks, their input depends on what the players sense
+
+    :param players: players per side, a key of FORMATIONS
+    :param nearest: number of nearest opponents and teammates sensed, None senses every opponent,
+    see sensors.slots()
+    :param hidden: offense and defense hidden layer sizes, defaults to OFFENSE_HIDDEN and DEFENSE_HIDDEN
+    :return: offense and defense layer sizes
+    """
+    offense_hidden, defense_hidden = hidden if hidden is not None else (OFFENSE_HIDDEN, DEFENSE_HIDDEN)
+    offense_size, defense_size = team_sizes(players)
+    return [sensors.inputs_size(*sensors.slots(offense_size, defense_size, nearest)), *offense_hidden, 2], \
+        [sensors.inputs_size(*sensors.slots(defense_size, offense_size, nearest)), *defense_hidden, 2]
 
 
 class Team:
     """
     Object for controlling a team of players
     """
-    def __init__(self, positions: dict, stats: dict, color: str):
+    def __init__(self, positions: dict, stats: dict, color: str, networks: list[Network] = None,
+                 layer_sizes: list[int] = None):
+        """
+        :param positions: dict of role to number of players in that role
+        :param stats: dict of role to [speed, strength]
+        :param color: color of the team's sprites
+        :param networks: networks for each player, usually views into a neural_net.Population,
+        defaults to new random networks
+        :param layer_sizes: layer sizes of the new random networks, see network_sizes()
+        """
+        # Sprites are only loaded once teams are built, so the rosters above can be used without pygame
+        import pygame
+        from player import Player
+
+        self.positions = positions
         self.players = pygame.sprite.RenderPlain()
-        player_id = 0
-        for role, num_of in positions.items():
-            for p in range(num_of):
-                # noinspection PyTypeChecker
-                self.players.add(Player(role, color, stats[role], player_id))
-                player_id += 1
-
-    def mutate(self):
+        for player_id, (role, role_stats) in enumerate(roster(positions, stats)):
+            network = networks[player_id] if networks is not None else Network(layer_sizes)
+            # noinspection PyTypeChecker
+            self.players.add(Player(role, color, role_stats, player_id, network))
+
+    @property
+    def networks(self) -> list[Network]:
         """
-        calls Network.mutate() on player's network for each member
+        the network of each player in player_id order
         """
-        for player in self.players:
-            player.network.mutate()
+        return [player.network for player in self.players]
 
-    def set_team(self, x_bounds, y_bound, starting_angle):
+    def set_team(self, x_bounds, y_bound, starting_angle, positions=None, angles=None):
         """
         PLace a teams players before the start of a play.
 
         :param x_bounds: x coordinate bounds for the field
         :param y_bound: y coordinate for where players may be placed
         :param starting_angle: angle players on the team face on play start
+        :param positions: fraction of the way across half the field each player starts at, defaults to random
+        :param angles: angle each player faces on play start, defaults to starting_angle
         """
-        for player in self.players:
-            x = random.uniform(0, (x_bounds[1] - x_bounds[0]) / 2) + 1.25 * x_bounds[0]
+        for i, player in enumerate(self.players):
+            if positions is None:
+                x = random.uniform(0, (x_bounds[1] - x_bounds[0]) / 2) + 1.25 * x_bounds[0]
+            else:
+                x = positions[i] * (x_bounds[1] - x_bounds[0]) / 2 + 1.25 * x_bounds[0]
             player.rect.center = (x, y_bound)
-            player.angle = starting_angle
+            player.angle = starting_angle if angles is None else angles[i]
             player.image = player.sprite
-            if player.role == "RB":
+            if player.role == BALL_CARRIER:
                 player.has_ball = True
 
 
@@ -50,31 +137,57 @@ class Offense(Team):
     """
     Subclass of Team representing an offense
     """
-    def __init__(self):
-        super().__init__(OFFENSE_POSITIONS, OFFENSE_STATS, "Red")
+    def __init__(self, networks: list[Network] = None, positions: dict = None, hidden: list[int] = None):
+        """
+        :param networks: networks for each player, defaults to new random networks
+        :param positions: dict of role to number of players in that role, defaults to OFFENSE_POSITIONS
+        :param hidden: hidden layer sizes of new random networks, which sense every opponent of an equally
+        sized defense, see network_sizes(). Defaults to OFFENSE_HIDDEN
+        """
+        positions = positions or OFFENSE_POSITIONS
+        layer_sizes = None
+        if networks is None:
+            hidden = OFFENSE_HIDDEN if hidden is None else hidden
+            layer_sizes = network_sizes(sum(positions.values()), hidden=(hidden, DEFENSE_HIDDEN))[0]
+        super().__init__(positions, OFFENSE_STATS, "Red", networks, layer_sizes)
 
-    def set_offense(self, x_bounds: tuple[float, float], height: float):
+    def set_offense(self, x_bounds: tuple[float, float], height: float, positions=None, angles=None):
         """
         sets the offense by calling Team.set_team() with proper parameters
 
         :param x_bounds: x coordinate bounds for the field
         :param height: height of the field/window in pixels
+        :param positions: fraction of the way across half the field each player starts at, defaults to random
+        :param angles: angle each player faces on play start, defaults to facing the end zone
         """
-        self.set_team(x_bounds, field.yard_to_pixel(80, height), 90)
+        self.set_team(x_bounds, field.yard_to_pixel(80, height), 90, positions, angles)
 
 
 class Defense(Team):
     """
     Subclass of Team representing a defense
     """
-    def __init__(self):
-        super().__init__(DEFENSE_POSITIONS, DEFENSE_STATS, "Blue")
+    def __init__(self, networks: list[Network] = None, positions: dict = None, hidden: list[int] = None):
+        """
+        :param networks: networks for each player, defaults to new random networks
+        :param positions: dict of role to number of players in that role, defaults to DEFENSE_POSITIONS
+        :param hidden: hidden layer sizes of new random networks, which sense every opponent of an equally
+        sized offense, see network_sizes(). Defaults to DEFENSE_HIDDEN
+        """
+        positions = positions or DEFENSE_POSITIONS
+        layer_sizes = None
+        if networks is None:
+            hidden = DEFENSE_HIDDEN if hidden is None else hidden
+            layer_sizes = network_sizes(sum(positions.values()), hidden=(OFFENSE_HIDDEN, hidden))[1]
+        super().__init__(positions, DEFENSE_STATS, "Blue", networks, layer_sizes)
 
-    def set_defense(self, x_bounds: tuple[float, float], height: float):
+    def set_defense(self, x_bounds: tuple[float, float], height: float, positions=None, angles=None):
         """
         sets the defense by calling Team.set_team() with proper parameters
 
         :param x_bounds: x coordinate bounds for the field
         :param height: height of the field/window in pixels
+        :param positions: fraction of the way across half the field each player starts at, defaults to random
+        :param angles: angle each player faces on play start, defaults to facing the offense
         """
-        self.set_team(x_bounds, field.yard_to_pixel(20, height), 270)
+        self.set_team(x_bounds, field.yard_to_pixel(20, height), 270, positions, angles)
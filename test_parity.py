@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pytest
+
+# Gridiron games need a display surface, the dummy driver gives one without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+import gridiron
+import team
+from engine import Engine
+from evolution import FIELD_BOUNDS, SCREEN_SIZE
+from neural_net import Population
+from scenarios import ScenarioTable
+
+GAMES = 60
+TICKS = 600
+
+
+def play_both(players: int, nearest=None, decision_interval=1, seed=0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Plays the same games on the Engine and on Gridiron objects, every game starting its plays from the same
+    scenario on both
+
+    :param players: players per side, a key of team.FORMATIONS
+    :param nearest: number of nearest players sensed, None senses every opponent
+    :param decision_interval: ticks between network decisions
+    :param seed: seed of the populations and the scenarios
+    :return: points scored in each game on the Engine and on Gridiron
+    """
+    pygame.init()
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    rng = np.random.RandomState(seed)
+    offense_size, defense_size = team.team_sizes(players)
+    offense_sizes, defense_sizes = team.network_sizes(players, nearest)
+    offense = Population(GAMES * offense_size, offense_sizes, rng=rng)
+    defense = Population(GAMES * defense_size, defense_sizes, rng=rng)
+    table = ScenarioTable(players, GAMES, seed=seed)
+    scenario_index = np.arange(GAMES)
+
+    engine = Engine(offense, defense, FIELD_BOUNDS, SCREEN_SIZE[1], game_ids=scenario_index, players=players,
+                    nearest=nearest, decision_interval=decision_interval, scenarios=table)
+    engine.run(TICKS)
+
+    offense_positions, defense_positions = team.formation(players)
+    games = [gridiron.Gridiron(team.Offense(offense.networks[i * offense_size:(i + 1) * offense_size],
+                                            offense_positions),
+                               team.Defense(defense.networks[i * defense_size:(i + 1) * defense_size],
+                                            defense_positions),
+                               FIELD_BOUNDS, screen, nearest, decision_interval, scenarios=table, scenario=s)
+             for i, s in enumerate(scenario_index)]
+    for _ in range(TICKS):
+        gridiron.update_games(games)
+    return engine.results()[0], np.array([game.points for game in games], dtype=float)
+
+
+@pytest.mark.parametrize("players", [3, 7, 11])
+@pytest.mark.parametrize("nearest", [None, 3])
+def test_engine_matches_gridiron(players, nearest):
+    engine_points, gridiron_points = play_both(players, nearest)
+    np.testing.assert_array_equal(engine_points, gridiron_points)
+
+
+@pytest.mark.parametrize("decision_interval", [2, 3])
+def test_engine_matches_gridiron_between_decisions(decision_interval):
+    engine_points, gridiron_points = play_both(5, decision_interval=decision_interval)
+    np.testing.assert_array_equal(engine_points, gridiron_points)
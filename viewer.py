@@ -0,0 +1,183 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import pygame
+import field
+import player
+import team
+
+FPS = 60
+READ_TRIES = 100
+
+# Slots at the start of a snapshot, followed by the x, y, angle and has_ball of every player
+SEQUENCE, GENERATION, POINTS, SCRIMMAGE = range(4)
+HEADER = 4
+
+
+class Snapshot:
+    """
+    Latest state of the displayed game in a block of shared memory. The simulation writes it without ever
+    waiting on the viewer: the sequence number is odd while a write is in progress and reads that overlap
+    a write are retried, so a slow or closed viewer can't hold the simulation back.
+    """
+    def __init__(self, players: int, name=None):
+        """
+        :param players: number of players in a game, offense first
+        :param name: name of the shared memory block to attach to, None creates a new block
+        """
+        self.players = players
+        self.block = shared_memory.SharedMemory(name=name, create=name is None, size=(HEADER + 4 * players) * 8)
+        self.data = np.ndarray(HEADER + 4 * players, dtype=np.float64, buffer=self.block.buf)
+        if name is None:
+            self.data[:] = 0
+
+    def write(self, game, generation: int):
+        """
+        Publishes the state of a game
+
+        :param game: gridiron.Gridiron being displayed
+        :param generation: generation the game is played in
+        """
+        players = list(game.offense.players) + list(game.defense.players)
+        state = self.data[HEADER:].reshape(4, self.players)
+        self.data[SEQUENCE] += 1
+        self.data[GENERATION] = generation
+        self.data[POINTS] = game.points
+        self.data[SCRIMMAGE] = game.scrimmage
+        state[0] = [p.rect.centerx for p in players]
+        state[1] = [p.rect.centery for p in players]
+        state[2] = [p.angle for p in players]
+        state[3] = [p.has_ball for p in players]
+        self.data[SEQUENCE] += 1
+
+    def read(self) -> np.ndarray | None:
+        """
+        Copies the latest complete state
+
+        :return: copy of the snapshot, None when every try overlapped a write or nothing was written yet
+        """
+        for _ in range(READ_TRIES):
+            sequence = self.data[SEQUENCE]
+            if sequence % 2:
+                continue
+            data = self.data.copy()
+            if data[SEQUENCE] == sequence and self.data[SEQUENCE] == sequence:
+                return data if sequence else None
+        return None
+
+    def close(self):
+        """
+        Detaches from the shared memory
+        """
+        self.data = None
+        self.block.close()
+
+
+class Viewer:
+    """
+    Renders the displayed game in its own process at its own frame rate, see view().
+    The simulation only writes a Snapshot each tick, closing the viewer window leaves it running.
+    """
+    def __init__(self, size: tuple[int, int], bounds: tuple[float, float], players=team.PLAYERS, fps=FPS):
+        """
+        :param size: size of the viewer window
+        :param bounds: x coordinates bounding the field on screen
+        :param players: players per side, a key of team.FORMATIONS
+        :param fps: frame rate the viewer renders at
+        """
+        self.snapshot = Snapshot(sum(team.team_sizes(players)))
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=view, args=(self.snapshot.block.name, players, size, bounds, fps), daemon=True)
+        self.process.start()
+
+    def update(self, game, generation: int):
+        """
+        Publishes the state of the displayed game to the viewer
+
+        :param game: gridiron.Gridiron being displayed
+        :param generation: generation the game is played in
+        """
+        self.snapshot.write(game, generation)
+
+    def close(self):
+        """
+        Stops the viewer process and releases the shared memory
+        """
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.snapshot.close()
+        self.snapshot.block.unlink()
+
+
+def view(name: str, players: int, size: tuple[int, int], bounds: tuple[float, float], fps=FPS):
+    """
+    Viewer process loop, draws the latest Snapshot until the window is closed
+
+    :param name: name of the snapshot's shared memory block
+    :param players: players per side, a key of team.FORMATIONS
+    :param size: size of the viewer window
+    :param bounds: x coordinates bounding the field on screen
+    :param fps: frame rate to render at
+    """
+    snapshot = Snapshot(sum(team.team_sizes(players)), name)
+    pygame.init()
+    screen = pygame.display.set_mode(size)
+    pygame.display.set_caption("FootballAI")
+    clock = pygame.time.Clock()
+    roles = sprites(players)
+    caption = None
+
+    running = True
+    while running:
+        clock.tick(fps)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        data = snapshot.read()
+        if data is None:
+            continue
+        if (data[GENERATION], data[POINTS]) != caption:
+            caption = (data[GENERATION], data[POINTS])
+            pygame.display.set_caption(f"FootballAI - Generation #{int(caption[0])} - {int(caption[1])} points")
+
+        draw(screen, size, bounds, data[SCRIMMAGE], roles, *data[HEADER:].reshape(4, len(roles)))
+        pygame.display.flip()
+
+    snapshot.close()
+    pygame.quit()
+
+
+def sprites(players: int) -> list[tuple[str, str]]:
+    """
+    Gets the sprite color and role of every player of a formation
+
+    :param players: players per side, a key of team.FORMATIONS
+    :return: (color, role) of each player, offense first
+    """
+    offense_positions, defense_positions = team.formation(players)
+    return [("Red", role) for role, _ in team.roster(offense_positions, team.OFFENSE_STATS)] + \
+        [("Blue", role) for role, _ in team.roster(defense_positions, team.DEFENSE_STATS)]
+
+
+def draw(screen: pygame.Surface, size: tuple[int, int], bounds: tuple[float, float], scrimmage: float,
+         roles: list[tuple[str, str]], x, y, angle, has_ball):
+    """
+    Draws the field and the players of a game from their state alone, without any Gridiron or Player
+
+    :param screen: surface to draw on
+    :param size: size of the screen
+    :param bounds: x coordinates bounding the field on screen
+    :param scrimmage: y coordinate of the line of scrimmage
+    :param roles: (color, role) of each player from sprites()
+    :param x: x coordinate of each player
+    :param y: y coordinate of each player
+    :param angle: angle of each player
+    :param has_ball: whether each player has the ball
+    """
+    screen.blit(field.get_field_surface(size, bounds), (0, 0))
+    field.draw_line_from_pixel(scrimmage, bounds, screen, color=(0, 0, 255))
+    for i, (color, role) in enumerate(roles):
+        image = player.get_rotated_sprite(color, role, angle[i], bool(has_ball[i]))
+        screen.blit(image, image.get_rect(center=(x[i], y[i])))